@@ -0,0 +1,10 @@
+"""
+Headless core of the Odds Apex models.
+
+The Tk scripts in the repository root are front-ends over this package: they
+read their form and draw what odds_apex.reports returns.  The same math is
+plain NumPy functions here, so it can be run for many matches at once
+without a display.  Nothing in the package imports tkinter, and
+`python -m odds_apex.bench` fails if that changes or if importing it gets
+slow.
+"""
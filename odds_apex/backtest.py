@@ -0,0 +1,228 @@
+"""
+Replay historical in-play timelines through every model preset.
+
+Input is JSONL, one snapshot per line, keyed like the Tk forms plus a match
+id and the final score (given on at least one snapshot of each match):
+
+    {"Match Id": "ars-che", "Elapsed Minutes": 30, "Home Xg": 1.1, ...,
+     "Live Odds Home": 2.4, ..., "Final Home Goals": 2, "Final Away Goals": 1}
+
+Each snapshot is priced the way a script prices a Calculate click at that
+minute (the match history is pushed first, so the prior is the one the
+script would have seen), every bet the script would recommend is recorded,
+and each bet is settled against the final score.  All snapshots go through
+the model as one batch, so a season costs a few vectorised passes rather
+than one click per row:
+
+    python -m odds_apex.backtest season.jsonl --bankroll 1000
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from odds_apex.engine import stack_states
+from odds_apex.history import HistoryStore
+from odds_apex.live import MATCH_ID_KEYS
+from odds_apex.nb import nb_pmf
+from odds_apex.pool import ShardedEvaluator
+from odds_apex.registry import PRESETS, timescale_groups
+from odds_apex.staking import NO_BET, settle
+from odds_apex.stream import add_engine_options, dump_pmf_stats, pmf_option
+
+FINAL_SCORE = (("Final Home Goals", "final_home_goals"), ("Final Away Goals", "final_away_goals"))
+
+CHUNK_SIZE = 16384  # snapshots priced at once; bounds the size of the score grids
+
+
+def load_snapshots(lines):
+    """JSONL lines -> list of snapshot dicts (blank lines skipped)."""
+    snapshots = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            snapshot = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: invalid JSON: {e}") from None
+        if not isinstance(snapshot, dict):
+            raise ValueError(f"line {number}: snapshot is not a JSON object")
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _split(snapshot):
+    """One snapshot -> (match id, [final home, final away], model inputs)."""
+    row = dict(snapshot)  # stack_states maps the labels
+    match_id = next((row.pop(key) for key in MATCH_ID_KEYS if key in row), "")
+    final = []
+    for label, name in FINAL_SCORE:
+        value = row.pop(label, None)
+        value = row.pop(name, value)
+        final.append(np.nan if value is None else float(value))
+    return str(match_id), final, row
+
+
+def _final_scores(codes, finals, match_ids):
+    """Spread each match's final score to all of its snapshots."""
+    matches = codes.max() + 1 if codes.size else 0
+    score = np.full((matches, 2), np.nan)
+    known = ~np.isnan(finals).any(axis=1)
+    score[codes[known]] = finals[known]
+    missing = np.isnan(score[:, 0])
+    if missing.any():
+        first = match_ids[np.flatnonzero(missing[codes])[0]]
+        raise ValueError(f"match {first!r} has no final score (Final Home Goals / Final Away Goals)")
+    return score[codes, 0], score[codes, 1]
+
+
+def priors(codes, steps, states, timescale=None, history_length=10):
+    """
+    dynamic_expected_lambda at every snapshot: each match's history is
+    pushed one snapshot at a time, all matches together.  `codes` and
+    `steps` give each snapshot's match and its position in that match.
+    """
+    prior_home = np.empty(codes.size)
+    prior_away = np.empty(codes.size)
+    if not codes.size:
+        return prior_home, prior_away
+    store = HistoryStore(length=history_length, capacity=int(codes.max()) + 1, timescale=timescale)
+    order = np.argsort(steps, kind="stable")
+    bounds = np.flatnonzero(np.diff(steps[order])) + 1
+    for rows in np.split(order, bounds):
+        ids = codes[rows]
+        store.push_states(ids, {name: column[rows] for name, column in states.items()})
+        prior_home[rows] = store.expected_lambda('home', ids)
+        prior_away[rows] = store.expected_lambda('away', ids)
+    return prior_home, prior_away
+
+
+def outcomes(states, final_home, final_away):
+    """Whether each market's selection won, per snapshot."""
+    home_won = final_home > final_away
+    return {
+        "home": home_won,
+        "draw": final_home == final_away,
+        "away": final_home < final_away,
+        "over": final_home + final_away > states["home_goals"] + states["away_goals"],
+        "selected": (final_home == states["selected_home_goals"]) & (final_away == states["selected_away_goals"]),
+        "hedge_home": home_won,
+    }
+
+
+def replay(snapshots, names=None, bankroll=None, history_length=10, chunk_size=CHUNK_SIZE, pmf=nb_pmf,
+           tail_tolerance=None, workers=1):
+    """
+    Price, stake and settle every snapshot for the named presets (default
+    all).  `bankroll` replaces the snapshots' Account Balance when given;
+    `pmf` and `tail_tolerance` are as for stream.price_ticks.  With
+    `workers` > 1 the chunks are priced and staked across that many
+    processes (odds_apex.pool); None uses every CPU.
+
+    Returns {"match_id", "elapsed_minutes", "presets"}: the first two are
+    per-snapshot arrays sorted by match then minute, and "presets" maps
+    each preset to {market: decision arrays plus "pnl"}, aligned with them.
+    """
+    names = list(PRESETS) if names is None else list(names)
+    split = [_split(snapshot) for snapshot in snapshots]
+    match_ids = np.asarray([match_id for match_id, _, _ in split], dtype=object)
+    finals = np.asarray([final for _, final, _ in split], dtype=np.float64).reshape(-1, 2)
+    states = stack_states([row for _, _, row in split])
+    if bankroll is not None:
+        states["account_balance"][:] = bankroll
+
+    _, codes = np.unique(match_ids.astype(str), return_inverse=True)
+    codes = codes.reshape(-1)
+    order = np.lexsort((states["elapsed_minutes"], codes))
+    codes, match_ids, finals = codes[order], match_ids[order], finals[order]
+    states = {name: column[order] for name, column in states.items()}
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if codes.size else np.zeros(0, dtype=np.intp)
+    steps = np.arange(codes.size) - np.repeat(starts, np.diff(np.r_[starts, codes.size]))
+    final_home, final_away = _final_scores(codes, finals, match_ids)
+    won = outcomes(states, final_home, final_away)
+
+    presets = {name: {} for name in names}
+    if codes.size:
+        with ShardedEvaluator(workers, chunk_size, pmf) as evaluator:
+            for timescale, group in timescale_groups(names).items():
+                prior_home, prior_away = priors(codes, steps, states, timescale, history_length)
+                staked = evaluator.stake(states, group, prior_home, prior_away, tail_tolerance)
+                for name in group:
+                    for market, decision in staked[name].items():
+                        decision["pnl"] = settle(decision, won[market])
+                    presets[name] = staked[name]
+
+    return {
+        "match_id": match_ids,
+        "elapsed_minutes": states["elapsed_minutes"],
+        "presets": {name: presets[name] for name in names},
+    }
+
+
+def _totals(side, stake, liability, pnl):
+    bets = side != NO_BET
+    count = int(bets.sum())
+    risked = float(liability[bets].sum())
+    profit = float(pnl[bets].sum())
+    return {
+        "bets": count,
+        "staked": float(stake[bets].sum()),
+        "risked": risked,
+        "pnl": profit,
+        "roi": profit / risked if risked > 0 else None,
+        "hit_rate": float((pnl[bets] > 0).mean()) if count else None,
+    }
+
+
+def summarise(replayed):
+    """
+    Per preset and market (plus a "total" over all markets): number of
+    bets, total stake, total liability ("risked"), P&L, P&L per unit risked
+    and the share of bets that made money.
+    """
+    summary = {}
+    for name, markets in replayed["presets"].items():
+        summary[name] = {
+            market: _totals(decision["side"], decision["stake"], decision["liability"], decision["pnl"])
+            for market, decision in markets.items()
+        }
+        if markets:
+            summary[name]["total"] = _totals(*(
+                np.concatenate([decision[key] for decision in markets.values()])
+                for key in ("side", "stake", "liability", "pnl")
+            ))
+    return summary
+
+
+def backtest(snapshots, names=None, bankroll=None, history_length=10, chunk_size=CHUNK_SIZE, pmf=nb_pmf,
+             tail_tolerance=None, workers=1):
+    """replay() then summarise()."""
+    return summarise(replay(snapshots, names, bankroll, history_length, chunk_size, pmf, tail_tolerance, workers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the model presets on historical in-play snapshots.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file, or - for stdin (default)")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS),
+                        help="model preset to test; repeat for several (default: all)")
+    parser.add_argument("--bankroll", type=float,
+                        help="stake every snapshot from this balance instead of its Account Balance")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to price the snapshots across (default 1; 0 for every CPU)")
+    add_engine_options(parser)
+    args = parser.parse_args(argv)
+    if args.input == "-":
+        snapshots = load_snapshots(sys.stdin)
+    else:
+        with open(args.input) as lines:
+            snapshots = load_snapshots(lines)
+    json.dump(backtest(snapshots, args.preset, args.bankroll, pmf=pmf_option(args),
+                       tail_tolerance=args.tail_tolerance, workers=args.workers or None), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    dump_pmf_stats(args)
+
+
+if __name__ == "__main__":
+    main()
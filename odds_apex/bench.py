@@ -0,0 +1,358 @@
+"""
+Benchmarks for the pricing hot paths, without a display.
+
+Each preset is run the way its script's calculate_all runs a click: the
+history is updated, the markets are priced and the bets are sized.  The
+suite reports
+
+    calculate/<preset>  per-call latency percentiles for single states
+    report/<preset>     the same for a whole click as the window runs it,
+                        ScriptReport.report from form values to output
+                        records
+    odds_tick/<preset>  the same when only the live odds move, reusing the
+                        cached stages of the previous call
+    batch/<preset>      throughput for a batch of states (matches/s)
+    lambda_chain, score_grid, staking/<preset>
+                        throughput of the stages on their own
+    pmf_table           every preset priced off the quantized PmfTable, with
+                        its hit and miss counts
+    scenario_pnl        throughput of hedge.py's book priced over its score grid
+    hedge_solver        throughput of the best-worst-case hedge of its lay
+    sharded             with --workers, every preset priced and staked across
+                        a warm process pool (odds_apex.pool)
+    import              cold import time of the core in a fresh interpreter
+
+and the peak memory each batch run allocates.  Results are JSON so a run
+can be compared with an earlier one:
+
+    python -m odds_apex.bench --output before.json
+    python -m odds_apex.bench --compare before.json   # exit 1 on regression
+
+The run also fails (exit 1) when importing the core takes longer than
+IMPORT_BUDGET_MS or pulls in tkinter, since pricing workers start often and
+have no display.
+
+States are synthetic unless --states gives a JSONL file of recorded ones.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from odds_apex import engine, nb
+from odds_apex.backtest import load_snapshots
+from odds_apex.history import History
+from odds_apex.hedging import hedge_candidates, solve_hedge
+from odds_apex.pipeline import DECAY_CORRECT_SCORE, Evaluation
+from odds_apex.pmf_cache import PmfTable
+from odds_apex.pool import ShardedEvaluator
+from odds_apex.positions import hedge_positions, scenario_pnl
+from odds_apex.registry import PRESETS, evaluate_presets
+from odds_apex.reports import ScriptReport
+from odds_apex.staking import stake_preset
+from odds_apex.state import MatchBatch
+
+PERCENTILES = (50, 90, 99)
+
+# metric -> +1 when bigger is worse, -1 when smaller is worse
+DIRECTIONS = {"p50_us": 1, "p90_us": 1, "p99_us": 1, "matches_per_s": -1, "peak_kib": 1, "import_ms": 1}
+COMPARED = ("p50_us", "p99_us", "matches_per_s", "peak_kib", "import_ms")
+
+# What a headless worker imports, and how long that may take (best of a few
+# cold starts; numpy is most of it).
+CORE_MODULES = ("odds_apex.reports", "odds_apex.stream", "odds_apex.live", "odds_apex.backtest")
+IMPORT_BUDGET_MS = 250.0
+
+
+def synthetic_states(size, seed=0):
+    """`size` plausible in-play states as a stacked batch."""
+    rng = np.random.default_rng(seed)
+    uniform = rng.uniform
+    home_goals = rng.integers(0, 4, size).astype(np.float64)
+    away_goals = rng.integers(0, 4, size).astype(np.float64)
+    home_possession = uniform(25, 75, size)
+    states = {
+        "home_avg_goals_scored": uniform(0.5, 2.5, size),
+        "home_avg_goals_conceded": uniform(0.5, 2.5, size),
+        "away_avg_goals_scored": uniform(0.5, 2.5, size),
+        "away_avg_goals_conceded": uniform(0.5, 2.5, size),
+        "home_xg": uniform(0.3, 3.0, size),
+        "away_xg": uniform(0.3, 3.0, size),
+        "elapsed_minutes": uniform(0, 90, size),
+        "home_goals": home_goals,
+        "away_goals": away_goals,
+        "in_game_home_xg": uniform(0, 2.5, size),
+        "in_game_away_xg": uniform(0, 2.5, size),
+        "home_possession": home_possession,
+        "away_possession": 100 - home_possession,
+        "home_sot": rng.integers(0, 10, size).astype(np.float64),
+        "away_sot": rng.integers(0, 10, size).astype(np.float64),
+        "home_op_box_touches": uniform(0, 45, size),
+        "away_op_box_touches": uniform(0, 45, size),
+        "home_corners": uniform(0, 10, size),
+        "away_corners": uniform(0, 10, size),
+        "live_next_goal_odds": uniform(1.2, 5, size),
+        "live_odds_home": uniform(1.2, 12, size),
+        "live_odds_draw": uniform(2.5, 8, size),
+        "live_odds_away": uniform(1.2, 12, size),
+        "account_balance": np.full(size, 1000.0),
+        "cumulative_loss": uniform(-200, 0, size),
+        "locked_profit": uniform(0, 200, size),
+        "market_odds_current": uniform(2, 15, size),
+        "live_selected_odds": uniform(3, 40, size),
+        "selected_home_goals": home_goals + rng.integers(0, 2, size),
+        "selected_away_goals": away_goals + rng.integers(0, 2, size),
+    }
+    return engine.stack_states(states)
+
+
+def recorded_states(path):
+    """Stacked batch of the snapshots in a JSONL file (backtest format)."""
+    with open(path) as lines:
+        return engine.stack_states(load_snapshots(lines))
+
+
+def _row(states, index):
+    return {name: column[index:index + 1] for name, column in states.items()}
+
+
+def _take(states, size):
+    """`size` states, cycling through `states` when it has fewer."""
+    count = len(next(iter(states.values())))
+    index = np.arange(size) % count
+    return {name: column[index] for name, column in states.items()}
+
+
+def calculate(name, states, history, evaluation=None):
+    """Headless calculate_all for one preset: history, pricing, staking."""
+    history.update_state({key: column[0] for key, column in states.items()})
+    results = evaluate_presets(states, [name], history.expected_lambda('home'), history.expected_lambda('away'),
+                               evaluation=evaluation)
+    return stake_preset(PRESETS[name], results[name], states)
+
+
+def odds_ticks(states, calls):
+    """`calls` copies of the first state with only the live match odds moving."""
+    ticks = []
+    for i in range(calls):
+        tick = {name: column[:1].copy() for name, column in states.items()}
+        for odds in ("live_odds_home", "live_odds_draw", "live_odds_away"):
+            tick[odds] *= 1 + 0.001 * (i % 50)
+        ticks.append(tick)
+    return ticks
+
+
+def latency(run, calls):
+    """Per-call percentiles in microseconds of run(i) for i in range(calls)."""
+    timings = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        run(i)
+        timings[i] = time.perf_counter_ns() - start
+    timings /= 1e3
+    result = {f"p{q}_us": float(np.percentile(timings, q)) for q in PERCENTILES}
+    result["max_us"] = float(timings.max())
+    result["calls"] = calls
+    return result
+
+
+def throughput(run, size, repeats=3):
+    """Best-of-`repeats` matches/s of run() over `size` states, and its peak memory."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"matches": size, "seconds": best, "matches_per_s": size / best, "peak_kib": peak / 1024}
+
+
+def import_time(modules=CORE_MODULES, repeats=5):
+    """
+    Best-of-`repeats` time to import `modules` in a fresh interpreter, in
+    milliseconds, and whether any of them imported tkinter.
+    """
+    code = "\n".join([
+        "import json, sys, time",
+        "start = time.perf_counter()",
+        *(f"import {module}" for module in modules),
+        "elapsed = time.perf_counter() - start",
+        "print(json.dumps({'ms': elapsed * 1e3, 'tkinter': 'tkinter' in sys.modules}))",
+    ])
+    # Import this copy of the package whatever the working directory.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    best, tkinter = float("inf"), False
+    for _ in range(repeats):
+        run = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+        result = json.loads(run.stdout)
+        best = min(best, result["ms"])
+        tkinter = tkinter or result["tkinter"]
+    return {"import_ms": best, "tkinter": tkinter, "modules": list(modules)}
+
+
+def run_suite(states, names=None, batch=10000, calls=200, repeats=3, workers=1):
+    """
+    Run every benchmark; returns {"meta": ..., "results": {benchmark: metrics}}.
+    `workers` other than 1 adds the sharded run (None for every CPU).
+    """
+    names = list(PRESETS) if names is None else list(names)
+    single = _take(states, calls)
+    batched = _take(states, batch)
+    results = {}
+
+    for name in names:
+        history = History(timescale=PRESETS[name].momentum_timescale)
+        results[f"calculate/{name}"] = latency(lambda i: calculate(name, _row(single, i), history), calls)
+    forms = MatchBatch(single).states()
+    for name in names:
+        model = ScriptReport(name, History(timescale=PRESETS[name].momentum_timescale))
+        results[f"report/{name}"] = latency(lambda i: model.report(forms[i]), calls)
+    ticks = odds_ticks(single, calls)
+    for name in names:
+        history = History(timescale=PRESETS[name].momentum_timescale)
+        evaluation = Evaluation(ticks[0])
+        results[f"odds_tick/{name}"] = latency(lambda i: calculate(name, ticks[i], history, evaluation), calls)
+    for name in names:
+        results[f"batch/{name}"] = throughput(
+            lambda: stake_preset(PRESETS[name], evaluate_presets(batched, [name])[name], batched), batch, repeats
+        )
+
+    lambda_home, lambda_away = engine.lambda_chain(batched, *DECAY_CORRECT_SCORE)
+    results["lambda_chain"] = throughput(lambda: engine.lambda_chain(batched, *DECAY_CORRECT_SCORE), batch, repeats)
+    results["score_grid"] = throughput(lambda: nb.score_grid(lambda_home, lambda_away, r=2), batch, repeats)
+    table = PmfTable()
+    results["pmf_table"] = throughput(lambda: evaluate_presets(batched, names, pmf=table.pmf), batch, repeats)
+    results["pmf_table"]["table"] = table.stats()
+    priced = evaluate_presets(batched, names)
+    for name in names:
+        results[f"staking/{name}"] = throughput(lambda: stake_preset(PRESETS[name], priced[name], batched), batch, repeats)
+    if "hedge" in names:
+        book = hedge_positions(batched, stake_preset(PRESETS["hedge"], priced["hedge"], batched))
+        grid = priced["hedge"]["score_grid"]
+        results["scenario_pnl"] = throughput(
+            lambda: scenario_pnl(book, grid, batched["home_goals"], batched["away_goals"]), batch, repeats
+        )
+        candidates = hedge_candidates(batched)
+        results["hedge_solver"] = throughput(
+            lambda: solve_hedge(book[:1], candidates, grid, batched["home_goals"], batched["away_goals"]), batch, repeats
+        )
+    if workers != 1:
+        with ShardedEvaluator(workers) as evaluator:
+            evaluator.stake(batched, names)
+            results["sharded"] = throughput(lambda: evaluator.stake(batched, names), batch, repeats)
+            results["sharded"]["workers"] = evaluator.workers
+    results["import"] = import_time()
+
+    meta = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "batch": batch,
+        "calls": calls,
+        "workers": workers,
+        "states": len(next(iter(states.values()))),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, threshold=0.20):
+    """
+    Regressions of `current` against `baseline` (both run_suite output):
+    a list of (benchmark, metric, baseline value, current value, change)
+    where a metric got worse by more than `threshold` (a fraction).
+    Benchmarks missing from either run are skipped.
+    """
+    for setting in ("batch", "calls"):
+        if current["meta"].get(setting) != baseline["meta"].get(setting):
+            raise ValueError(f"runs used different --{setting} and cannot be compared")
+    regressions = []
+    for benchmark, metrics in current["results"].items():
+        before = baseline["results"].get(benchmark)
+        if before is None:
+            continue
+        for metric in COMPARED:
+            if metric not in metrics or not before.get(metric):
+                continue
+            change = (metrics[metric] - before[metric]) / before[metric]
+            if change * DIRECTIONS[metric] > threshold:
+                regressions.append((benchmark, metric, before[metric], metrics[metric], change))
+    return regressions
+
+
+def report(suite, out):
+    for benchmark, metrics in suite["results"].items():
+        if "import_ms" in metrics:
+            out.write(f"{benchmark:32s} {metrics['import_ms']:9.1f} ms"
+                      f"{'  (imports tkinter)' if metrics['tkinter'] else ''}\n")
+        elif "p50_us" in metrics:
+            out.write(f"{benchmark:32s} p50 {metrics['p50_us']:9.1f} us  p90 {metrics['p90_us']:9.1f} us  "
+                      f"p99 {metrics['p99_us']:9.1f} us\n")
+        else:
+            out.write(f"{benchmark:32s} {metrics['matches_per_s']:12,.0f} matches/s  "
+                      f"peak {metrics['peak_kib']:10,.0f} KiB\n")
+        if "workers" in metrics:
+            out.write(f"{'':32s} across {metrics['workers']} worker processes\n")
+        if "table" in metrics:
+            table = metrics["table"]
+            out.write(f"{'':32s} {table['hits']:,} table hits, {table['misses']:,} misses "
+                      f"({table['lru_hits']:,} from the LRU)\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pricing hot paths.")
+    parser.add_argument("--states", help="JSONL file of recorded states (default: synthetic)")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS),
+                        help="preset to benchmark; repeat for several (default: all)")
+    parser.add_argument("--batch", type=int, default=10000, help="states per batch run (default 10000)")
+    parser.add_argument("--calls", type=int, default=200, help="single-state calls per preset (default 200)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="also price every preset across this many processes (0 for every CPU)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="fractional slowdown counted as a regression (default 0.20)")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS,
+                        help=f"ms the core may take to import (default {IMPORT_BUDGET_MS:g})")
+    args = parser.parse_args(argv)
+
+    states = recorded_states(args.states) if args.states else synthetic_states(max(args.batch, args.calls))
+    suite = run_suite(states, args.preset, args.batch, args.calls, workers=args.workers or None)
+    report(suite, sys.stdout)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(suite, out, indent=2)
+            out.write("\n")
+    failed = False
+    imported = suite["results"]["import"]
+    if imported["import_ms"] > args.import_budget:
+        sys.stdout.write(f"OVER BUDGET import: {imported['import_ms']:.1f} ms > {args.import_budget:g} ms\n")
+        failed = True
+    if imported["tkinter"]:
+        sys.stdout.write("TKINTER the core imports tkinter\n")
+        failed = True
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(suite, baseline, args.threshold)
+        for benchmark, metric, before, after, change in regressions:
+            sys.stdout.write(f"REGRESSION {benchmark} {metric}: {before:.6g} -> {after:.6g} ({change:+.0%})\n")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
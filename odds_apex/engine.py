@@ -0,0 +1,218 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+# Form labels used by the Tk scripts, mapped to the local variable names used
+# inside every calculate_all.
+FIELDS = {
+    "Home Avg Goals Scored": "home_avg_goals_scored",
+    "Home Avg Goals Conceded": "home_avg_goals_conceded",
+    "Away Avg Goals Scored": "away_avg_goals_scored",
+    "Away Avg Goals Conceded": "away_avg_goals_conceded",
+    "Home Xg": "home_xg",
+    "Away Xg": "away_xg",
+    "Elapsed Minutes": "elapsed_minutes",
+    "Home Goals": "home_goals",
+    "Away Goals": "away_goals",
+    "In-Game Home Xg": "in_game_home_xg",
+    "In-Game Away Xg": "in_game_away_xg",
+    "Home Possession %": "home_possession",
+    "Away Possession %": "away_possession",
+    "Home Shots on Target": "home_sot",
+    "Away Shots on Target": "away_sot",
+    "Home Opp Box Touches": "home_op_box_touches",
+    "Away Opp Box Touches": "away_op_box_touches",
+    "Home Corners": "home_corners",
+    "Away Corners": "away_corners",
+    "Live Next Goal Odds": "live_next_goal_odds",
+    "Live Odds Home": "live_odds_home",
+    "Live Odds Draw": "live_odds_draw",
+    "Live Odds Away": "live_odds_away",
+    "Account Balance": "account_balance",
+    # Fields only some of the scripts have.
+    "Live Odds Home Win": "live_odds_home",
+    "Live Odds Away Win": "live_odds_away",
+    "Cumulative Loss": "cumulative_loss",
+    "Locked Profit": "locked_profit",
+    "Market Odds for Current Scoreline": "market_odds_current",
+    "Live Odds for Selected Scoreline": "live_selected_odds",
+    "Selected Scoreline": "selected_scoreline",
+}
+
+# "Selected Scoreline" is free text such as "1-2"; batches carry it as two
+# numeric columns, -1 when the text does not parse.
+SCORELINE_COLUMNS = ("selected_home_goals", "selected_away_goals")
+
+# Numeric inputs carried by every batch, in form order.
+INPUTS = tuple(dict.fromkeys(
+    name for name in FIELDS.values() if name != "selected_scoreline"
+)) + SCORELINE_COLUMNS
+
+# Inputs the lambda chain reads.  Everything else in FIELDS is market or
+# bankroll data that only the later stages look at.
+CHAIN_INPUTS = (
+    "home_avg_goals_scored",
+    "home_avg_goals_conceded",
+    "away_avg_goals_scored",
+    "away_avg_goals_conceded",
+    "home_xg",
+    "away_xg",
+    "elapsed_minutes",
+    "home_goals",
+    "away_goals",
+    "in_game_home_xg",
+    "in_game_away_xg",
+    "home_possession",
+    "away_possession",
+    "home_sot",
+    "away_sot",
+    "home_op_box_touches",
+    "away_op_box_touches",
+    "home_corners",
+    "away_corners",
+)
+
+
+def field_name(key):
+    """Return the snake_case name for either a form label or a snake_case key."""
+    return FIELDS.get(key, key)
+
+
+def parse_scoreline(text):
+    """"1-2" -> (1, 2); anything else -> None, like the scripts' try/except."""
+    try:
+        home, away = map(int, str(text).strip().split('-'))
+    except ValueError:
+        return None
+    return home, away
+
+
+def _scoreline_columns(row):
+    text = row.pop("selected_scoreline", None)
+    if text is not None and not any(name in row for name in SCORELINE_COLUMNS):
+        row.update(zip(SCORELINE_COLUMNS, parse_scoreline(text) or (-1, -1)))
+    return row
+
+
+def stack_states(states, names=None, single=False):
+    """
+    Turn match states into a dict of float64 arrays, one entry per input.
+
+    `states` may be a single mapping, a sequence of mappings (keyed by form
+    label such as "Home Xg" or by snake_case name such as "home_xg"; a
+    MatchState is one), or a mapping whose values are already array-like
+    such as a MatchBatch.  Missing inputs are filled
+    with 0.0, the same value the Reset button writes into the form.  A
+    "Selected Scoreline" string is split into SCORELINE_COLUMNS.
+
+    With single=True `states` is one match's values (a tick or a form) and
+    a value that is not a scalar raises ValueError rather than being taken
+    for a column of a batch.
+    """
+    names = tuple(names or INPUTS)
+    if isinstance(states, Mapping):
+        if single:
+            for key, value in states.items():
+                if np.ndim(value):
+                    raise ValueError(f"{key}: expected a single value, got {value!r}")
+        columns = {field_name(key): value for key, value in states.items()}
+        if not any(np.ndim(value) for value in columns.values()):
+            # One match (a MatchState, or one form's values): a batch of one.
+            row = _scoreline_columns(columns)
+            return {name: np.array([float(row.get(name, 0.0))]) for name in names}
+        if "selected_scoreline" in columns:
+            texts = np.broadcast_to(np.asarray(columns.pop("selected_scoreline"), dtype=object), (
+                max(np.size(value) for value in columns.values()),
+            ))
+            parsed = [parse_scoreline(text) or (-1, -1) for text in texts]
+            columns.setdefault(SCORELINE_COLUMNS[0], [home for home, _ in parsed])
+            columns.setdefault(SCORELINE_COLUMNS[1], [away for _, away in parsed])
+        size = max(np.size(value) for value in columns.values())
+        return {
+            name: np.broadcast_to(np.asarray(columns.get(name, 0.0), dtype=np.float64), (size,)).copy()
+            for name in names
+        }
+    rows = [_scoreline_columns({field_name(key): value for key, value in state.items()}) for state in states]
+    return {
+        # float() rather than letting fromiter turn a JSON null into NaN.
+        name: np.fromiter((float(row.get(name, 0.0)) for row in rows), dtype=np.float64, count=len(rows))
+        for name in names
+    }
+
+
+def fraction_remaining(elapsed_minutes):
+    return np.maximum(0.0, (90 - elapsed_minutes) / 90.0)
+
+
+# ----- Model stages -----
+def time_decay_adjustment(lambda_xg, elapsed_minutes, coefficient=0.005, min_decay=0.4):
+    """
+    Vectorised time_decay_adjustment.  main.py and memory.py use 0.005/0.4,
+    the correct-score scripts use 0.003/0.5.
+    """
+    remaining_minutes = 90 - elapsed_minutes
+    base_decay = np.maximum(np.exp(-coefficient * elapsed_minutes), min_decay)
+    base_decay = np.where(remaining_minutes < 10, base_decay * 0.75, base_decay)
+    return np.maximum(0.1, lambda_xg * base_decay)
+
+
+def adjust_xg_for_scoreline(home_goals, away_goals, lambda_home, lambda_away, elapsed_minutes):
+    goal_diff = np.asarray(home_goals) - np.asarray(away_goals)
+    conditions = [goal_diff == 1, goal_diff == -1, goal_diff >= 2, goal_diff <= -2]
+    lambda_home = lambda_home * np.select(conditions, [0.9, 1.2, 0.8, 0.8], 1.0)
+    lambda_away = lambda_away * np.select(conditions, [1.2, 0.9, 1.3, 0.8], 1.0)
+
+    late = (elapsed_minutes > 75) & (np.abs(goal_diff) >= 1)
+    leading = goal_diff > 0
+    lambda_home = lambda_home * np.where(late, np.where(leading, 0.85, 1.15), 1.0)
+    lambda_away = lambda_away * np.where(late, np.where(leading, 1.15, 0.85), 1.0)
+    return lambda_home, lambda_away
+
+
+def prior_blend(lambda_home, lambda_away, s, fraction):
+    """Blend the in-play lambdas 85/15 with the pre-match attack/defence ratio."""
+    pm_component_home = s["home_avg_goals_scored"] / np.maximum(0.75, s["away_avg_goals_conceded"])
+    pm_component_away = s["away_avg_goals_scored"] / np.maximum(0.75, s["home_avg_goals_conceded"])
+    lambda_home = (lambda_home * 0.85) + (pm_component_home * 0.15 * fraction)
+    lambda_away = (lambda_away * 0.85) + (pm_component_away * 0.15 * fraction)
+    return lambda_home, lambda_away
+
+
+def in_play_multipliers(lambda_home, lambda_away, s, fraction):
+    """Possession, in-game xG, shots on target, box touches and corners."""
+    lambda_home = lambda_home * (1 + ((s["home_possession"] - 50) / 200) * fraction)
+    lambda_away = lambda_away * (1 + ((s["away_possession"] - 50) / 200) * fraction)
+
+    lambda_home = np.where(s["in_game_home_xg"] > 1.2, lambda_home * (1 + 0.15 * fraction), lambda_home)
+    lambda_away = np.where(s["in_game_away_xg"] > 1.2, lambda_away * (1 + 0.15 * fraction), lambda_away)
+
+    lambda_home = lambda_home * (1 + (s["home_sot"] / 20) * fraction)
+    lambda_away = lambda_away * (1 + (s["away_sot"] / 20) * fraction)
+
+    lambda_home = lambda_home * (1 + ((s["home_op_box_touches"] - 20) / 200) * fraction)
+    lambda_away = lambda_away * (1 + ((s["away_op_box_touches"] - 20) / 200) * fraction)
+
+    lambda_home = lambda_home * (1 + ((s["home_corners"] - 4) / 50) * fraction)
+    lambda_away = lambda_away * (1 + ((s["away_corners"] - 4) / 50) * fraction)
+    return lambda_home, lambda_away
+
+
+def lambda_chain(s, coefficient=0.005, min_decay=0.4):
+    """
+    Run the full in-play lambda chain for a batch of match states.
+
+    `s` is the output of stack_states (or any mapping of equal-length arrays
+    keyed by the CHAIN_INPUTS names).  Returns (lambda_home, lambda_away)
+    before any blending with the history-based prior, i.e. the values each
+    calculate_all holds just after the corners multiplier.
+    """
+    elapsed_minutes = s["elapsed_minutes"]
+    fraction = fraction_remaining(elapsed_minutes)
+
+    lambda_home = time_decay_adjustment(s["home_xg"] * fraction, elapsed_minutes, coefficient, min_decay)
+    lambda_away = time_decay_adjustment(s["away_xg"] * fraction, elapsed_minutes, coefficient, min_decay)
+    lambda_home, lambda_away = adjust_xg_for_scoreline(
+        s["home_goals"], s["away_goals"], lambda_home, lambda_away, elapsed_minutes
+    )
+    lambda_home, lambda_away = prior_blend(lambda_home, lambda_away, s, fraction)
+    return in_play_multipliers(lambda_home, lambda_away, s, fraction)
@@ -0,0 +1,179 @@
+"""
+Hedge stakes for an open book, searched across markets.
+
+hedge.py covers its selected-score lay with one Home back sized to win the
+liability.  solve_hedge() instead picks stakes on any set of candidate bets
+(match odds, correct score, over goals; odds_apex.positions.Position with the
+stake left at 0) for one of two aims over the score grid:
+
+    "worst"     maximise the worst-case P&L.  A linear programme, solved by
+                a log-barrier Newton method with a fixed iteration count, so
+                every match of a batch is solved in the same NumPy calls.
+                Stakes are 0..max_stake on the candidate's own side.
+    "variance"  minimise the variance of the P&L with its expected value
+                held at `target` (the book's own by default).  A quadratic
+                with one equality, solved in closed form; a negative stake
+                means the other side of the candidate at the same odds.
+
+Candidates at odds of 1 or less (an empty form field) are never staked.
+
+    book = hedge_positions(states, decisions)[:1]
+    hedged = solve_hedge(book, hedge_candidates(states), grid, home_goals, away_goals)
+    hedged["hedge"], hedged["worst"], hedged["seconds"]
+"""
+import time
+
+import numpy as np
+
+from odds_apex.positions import Position, payoff_matrix, scenario_pnl
+from odds_apex.staking import BACK, LAY
+
+OBJECTIVES = ("worst", "variance")
+
+# Barrier weights on the worst case and Newton steps per weight; the last
+# leaves a gap of about (cells + 2 * candidates) / 1e8 of the book's P&L range.
+BARRIER_WEIGHTS = (1.0, 1e2, 1e4, 1e6, 1e8)
+NEWTON_STEPS = 6
+
+
+def hedge_candidates(states):
+    """
+    The bets a form has live odds for: back Home, Draw or Away, back the
+    current score to stand (Market Odds Current) and back another goal (Live
+    Next Goal Odds, as loss.py's over market).
+    """
+    home_goals, away_goals = states["home_goals"], states["away_goals"]
+    return [
+        Position("home", BACK, states["live_odds_home"], 0.0),
+        Position("draw", BACK, states["live_odds_draw"], 0.0),
+        Position("away", BACK, states["live_odds_away"], 0.0),
+        Position("score", BACK, states["market_odds_current"], 0.0,
+                 selected_home_goals=home_goals, selected_away_goals=away_goals),
+        Position("over", BACK, states["live_next_goal_odds"], 0.0,
+                 line=np.asarray(home_goals, dtype=np.float64) + np.asarray(away_goals, dtype=np.float64) + 0.5),
+    ]
+
+
+def _max_worst_case(base, payoff, cap):
+    """
+    Stakes in [0, cap] maximising min(base + payoff @ stakes), for
+    base (..., cells), payoff (..., cells, k) and cap (..., k) > 0.
+    """
+    k = payoff.shape[-1]
+    stakes = cap / 2
+    worst = (base + np.matmul(payoff, stakes[..., None])[..., 0]).min(axis=-1) - 1
+    # Each cell's slack base + payoff @ stakes - worst, as a row over (stakes, worst).
+    rows = np.concatenate([payoff, -np.ones(payoff.shape[:-1] + (1,))], axis=-1)
+    columns = np.swapaxes(rows, -1, -2)
+    eye = np.eye(k)
+    for weight in BARRIER_WEIGHTS:
+        for _ in range(NEWTON_STEPS):
+            slack = base + np.matmul(payoff, stakes[..., None])[..., 0] - worst[..., None]
+            inverse = 1 / slack
+            low, high = stakes, cap - stakes
+            gradient = np.concatenate([
+                -np.matmul(inverse[..., None, :], payoff)[..., 0, :] - 1 / low + 1 / high,
+                inverse.sum(axis=-1, keepdims=True) - weight,
+            ], axis=-1)
+            hessian = np.matmul(columns, rows * (inverse ** 2)[..., None])
+            hessian[..., :k, :k] += eye * (low ** -2 + high ** -2)[..., None, :]
+            step = -np.linalg.solve(hessian, gradient[..., None])[..., 0]
+            d_stakes, d_worst = step[..., :k], step[..., k]
+            d_slack = np.matmul(payoff, d_stakes[..., None])[..., 0] - d_worst[..., None]
+            # Go at most 95% of the way to the nearest constraint.
+            limit = np.minimum.reduce([
+                np.where(d_slack < 0, slack / np.where(d_slack < 0, -d_slack, 1.0), np.inf).min(axis=-1),
+                np.where(d_stakes < 0, low / np.where(d_stakes < 0, -d_stakes, 1.0), np.inf).min(axis=-1),
+                np.where(d_stakes > 0, high / np.where(d_stakes > 0, d_stakes, 1.0), np.inf).min(axis=-1),
+            ])
+            alpha = np.minimum(1.0, 0.95 * limit)
+            stakes = stakes + alpha[..., None] * d_stakes
+            worst = worst + alpha * d_worst
+    return stakes
+
+
+def _min_variance(base, payoff, probs, target):
+    """
+    Signed stakes minimising the variance of base + payoff @ stakes under
+    `probs`, with its expected value moved by `target` from base's.
+    """
+    k = payoff.shape[-1]
+    mean_payoff = np.einsum("...c,...ci->...i", probs, payoff)
+    centred = payoff - mean_payoff[..., None, :]
+    centred_base = base - (probs * base).sum(axis=-1, keepdims=True)
+    covariance = np.einsum("...ci,...c,...cj->...ij", centred, probs, centred)
+    cross = np.einsum("...ci,...c,...c->...i", centred, probs, centred_base)
+    # [[covariance, mean], [mean', 0]] [stakes; multiplier] = [-cross; target]
+    kkt = np.zeros(covariance.shape[:-2] + (k + 1, k + 1))
+    kkt[..., :k, :k] = covariance
+    kkt[..., :k, k] = mean_payoff
+    kkt[..., k, :k] = mean_payoff
+    rhs = np.concatenate([-cross, np.asarray(target, dtype=np.float64)[..., None]], axis=-1)
+    # pinv: candidates that never pay (or pay alike) make the system singular.
+    return np.matmul(np.linalg.pinv(kkt), rhs[..., None])[..., :k, 0]
+
+
+def solve_hedge(book, candidates, grid, home_goals, away_goals, objective="worst", target=None, max_stake=None):
+    """
+    Stakes on `candidates` that hedge `book` over `grid`; see the module
+    docstring.
+
+    max_stake caps each candidate's stake for "worst" (by default, the stake
+    that would win the book's whole P&L range back); target is the expected
+    P&L to hold for "variance".  Returns scenario_pnl() of the book plus the
+    hedge, with stakes ((..., candidates), on each candidate's side and
+    negative for the other), hedge (the candidates as Positions with those
+    stakes, sides flipped where negative) and seconds (the solve time).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"unknown objective {objective!r}; expected one of {', '.join(OBJECTIVES)}")
+    start = time.perf_counter()
+    grid = np.asarray(grid, dtype=np.float64)
+    shape = grid.shape[-2:]
+    before = scenario_pnl(book, grid, home_goals, away_goals)
+    base = before["pnl"].reshape(before["pnl"].shape[:-2] + (-1,))
+    # A lay is the back of minus its stake, so each column pays per unit on the candidate's side.
+    sides = np.stack(np.broadcast_arrays(*[np.where(np.asarray(c.side) == LAY, -1.0, 1.0) for c in candidates]),
+                     axis=-1)
+    odds = np.stack(np.broadcast_arrays(*[np.asarray(c.odds, dtype=np.float64) for c in candidates]), axis=-1)
+    usable = odds > 1
+    payoff = payoff_matrix(candidates, home_goals, away_goals, shape) * sides[..., None, :]
+    payoff = np.where(usable[..., None, :], payoff, 0.0)
+    base, payoff = np.broadcast_arrays(base[..., :, None], payoff)
+    base = base[..., 0]
+
+    if objective == "worst":
+        span = before["best"] - before["worst"]
+        if max_stake is None:
+            # Backs win odds - 1 per unit, lays 1.
+            per_unit = np.where(sides > 0, np.where(usable, odds, 2.0) - 1, 1.0)
+            max_stake = np.asarray(span)[..., None] / per_unit
+        cap = np.where(usable, np.broadcast_to(max_stake, usable.shape), 0.0)
+        # Solve in units of the range so every match is scaled alike; a
+        # candidate that cannot be staked gets a dummy cap and is zeroed after.
+        scale = np.where(span > 0, span, 1.0)[..., None]
+        open_ = cap > 0
+        if open_.any():
+            stakes = _max_worst_case(base / scale, payoff, np.where(open_, cap, scale) / scale) * scale
+            stakes = np.where(open_, stakes, 0.0)
+        else:
+            # No book to hedge (or no odds to hedge it with).
+            stakes = np.zeros(cap.shape)
+    else:
+        probs = grid.reshape(grid.shape[:-2] + (-1,))
+        total = probs.sum(axis=-1, keepdims=True)
+        probs = probs / np.where(total > 0, total, 1.0)
+        shift = 0.0 if target is None else np.asarray(target, dtype=np.float64) - before["expected"]
+        probs = np.broadcast_to(probs, base.shape)
+        stakes = _min_variance(base, payoff, probs, np.broadcast_to(shift, base.shape[:-1]))
+
+    hedge = []
+    for column, candidate in enumerate(candidates):
+        stake = stakes[..., column]
+        flip = stake < 0
+        side = np.where(flip, -np.asarray(candidate.side), candidate.side)
+        hedge.append(candidate._replace(side=side[()], stake=np.abs(stake)[()]))
+    seconds = time.perf_counter() - start
+    result = scenario_pnl(list(book) + hedge, grid, home_goals, away_goals)
+    result.update(stakes=stakes, hedge=hedge, seconds=seconds)
+    return result
@@ -0,0 +1,293 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from odds_apex.engine import field_name
+
+# Inputs every script pushes into self.history before pricing.
+HISTORY_KEYS = ("home_xg", "away_xg", "home_sot", "away_sot", "home_possession", "away_possession")
+
+# Match minutes over which the time-decayed momentum prior forgets: a value
+# held this long ago counts 1/e as much as the current one.
+MOMENTUM_TIMESCALE = 15.0
+
+# Per-(match, metric) arrays besides the ring buffers themselves.
+STATS = ("sums", "squares", "ewma", "decayed_sums", "decayed_weights", "latest", "times")
+COUNTERS = ("counts", "positions")
+
+
+class HistoryStore:
+    """
+    Rolling history for many matches in preallocated ring buffers.
+
+    One row per match, one buffer of `length` values per metric.  Running
+    sums and sums of squares are updated as values go in and out, so the mean
+    (dynamic_expected_lambda) and variance cost O(1) per match; the exact sum
+    is recomputed each time a buffer wraps so rounding cannot drift.  An EWMA
+    with weight `alpha` on the newest value is kept alongside.
+
+    With a `timescale` (in match minutes) the store also keeps a time-decayed
+    average keyed by Elapsed Minutes: each value is weighted by how long it
+    was the latest one, discounted by exp(-age / timescale).  Pushing the
+    same minute ten times then counts no more than pushing it once, and
+    expected_lambda answers from this average instead of the click window.
+
+    Pushes and reads take arrays of match ids and are vectorised across
+    matches; ids within one push must be distinct.
+    """
+
+    def __init__(self, metrics=HISTORY_KEYS, length=10, capacity=64, alpha=0.3, timescale=None):
+        self.metrics = tuple(metrics)
+        self.columns = {metric: column for column, metric in enumerate(self.metrics)}
+        self.length = length
+        self.alpha = alpha
+        self.timescale = timescale
+        self.slots = {}
+        self._free = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        shape = (capacity, len(self.metrics))
+        old = getattr(self, "buffers", None)
+        buffers = np.zeros(shape + (self.length,))
+        arrays = {name: np.zeros(shape) for name in STATS}
+        arrays.update({name: np.zeros(shape, dtype=np.intp) for name in COUNTERS})
+        if old is not None:
+            rows = old.shape[0]
+            buffers[:rows] = old
+            for name in arrays:
+                arrays[name][:rows] = getattr(self, name)
+        self.buffers = buffers
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    # ----- Matches -----
+    def _key(self, match_id):
+        return match_id
+
+    def slot(self, match_id):
+        """Row for `match_id`, allocating one (and growing the store) if new."""
+        match_id = self._key(match_id)
+        row = self.slots.get(match_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self.slots)
+                if row == self.buffers.shape[0]:
+                    self._allocate(2 * row)
+            self.slots[match_id] = row
+        return row
+
+    def rows(self, match_ids):
+        return np.fromiter((self.slot(match_id) for match_id in match_ids), dtype=np.intp)
+
+    def clear(self, match_id):
+        """Empty the history of one match but keep its row."""
+        row = self.slots.get(self._key(match_id))
+        if row is not None:
+            self.buffers[row] = 0
+            for name in STATS + COUNTERS:
+                getattr(self, name)[row] = 0
+
+    def remove(self, match_id):
+        """Forget a match and reuse its row for the next new one."""
+        self.clear(match_id)
+        row = self.slots.pop(self._key(match_id), None)
+        if row is not None:
+            self._free.append(row)
+
+    # ----- Updates -----
+    def _push(self, rows, columns, values, minutes=None):
+        if self.timescale is not None:
+            self._accrue(rows, columns, values, minutes)
+        positions = self.positions[rows, columns]
+        full = self.counts[rows, columns] == self.length
+        leaving = np.where(full, self.buffers[rows, columns, positions], 0.0)
+        first = self.counts[rows, columns] == 0
+
+        self.buffers[rows, columns, positions] = values
+        self.sums[rows, columns] += values - leaving
+        self.squares[rows, columns] += values * values - leaving * leaving
+        self.ewma[rows, columns] = np.where(
+            first, values, self.alpha * values + (1 - self.alpha) * self.ewma[rows, columns]
+        )
+        self.counts[rows, columns] = np.minimum(self.counts[rows, columns] + 1, self.length)
+        positions = (positions + 1) % self.length
+        self.positions[rows, columns] = positions
+
+        wrapped = positions == 0
+        if wrapped.any():
+            rows, columns = rows[wrapped], columns[wrapped]
+            window = self.buffers[rows, columns]
+            self.sums[rows, columns] = window.sum(axis=-1)
+            self.squares[rows, columns] = (window * window).sum(axis=-1)
+
+    def _accrue(self, rows, columns, values, minutes):
+        """
+        Credit the previous latest value with the minutes it was held, decay
+        the running totals by the same span, then make `values` the latest.
+        Without `minutes` the clock stands still and only the latest changes.
+
+        A clock that goes backwards (a new match in the same row, a restart,
+        a corrected minute) starts the decayed totals again from `values`.
+        The newest value has not been held for any time yet, so it only
+        counts once the clock moves on: the decayed average lags one tick
+        behind, except straight after a start or restart, when it is the
+        newest value.
+        """
+        seen = self.counts[rows, columns] > 0
+        if minutes is not None:
+            minutes = np.broadcast_to(np.asarray(minutes, dtype=np.float64), rows.shape)
+            times = self.times[rows, columns]
+            running = seen & (minutes >= times)
+            held = np.where(running, minutes - times, 0.0)
+            decay = np.exp(-held / self.timescale)
+            credit = self.timescale * (1 - decay)
+            self.decayed_sums[rows, columns] = np.where(
+                running, self.decayed_sums[rows, columns] * decay + self.latest[rows, columns] * credit, 0.0
+            )
+            self.decayed_weights[rows, columns] = np.where(
+                running, self.decayed_weights[rows, columns] * decay + credit, 0.0
+            )
+            self.times[rows, columns] = minutes
+        self.latest[rows, columns] = values
+
+    def push(self, match_ids, metric, values, minutes=None):
+        """
+        Append one value of `metric` for each match in `match_ids`, observed
+        at `minutes` elapsed (used only by a store with a timescale).
+        """
+        rows = self.rows(match_ids)
+        columns = np.full(rows.shape, self.columns[metric])
+        minutes = None if minutes is None else np.asarray(minutes, dtype=np.float64).reshape(-1)
+        self._push(rows, columns, np.asarray(values, dtype=np.float64).reshape(rows.shape), minutes)
+
+    def push_states(self, match_ids, states):
+        """
+        Append every metric for each match.  `states` is a mapping of arrays
+        (e.g. from stack_states, or a MatchBatch) with one entry per match
+        id, or one state dict or MatchState per match id; their
+        elapsed_minutes drive the time decay.
+        """
+        if not isinstance(states, Mapping):
+            states = [{field_name(key): value for key, value in state.items()} for state in states]
+            states = {
+                metric: [state.get(metric, 0.0) for state in states]
+                for metric in self.metrics + ("elapsed_minutes",)
+            }
+        # Convert everything first so a bad value leaves the history untouched.
+        values = np.stack([np.asarray(states[metric], dtype=np.float64).reshape(-1) for metric in self.metrics], 1)
+        minutes = np.asarray(states.get("elapsed_minutes", 0.0), dtype=np.float64).reshape(-1)
+        rows = self.rows(match_ids)
+        rows, columns = np.broadcast_arrays(rows[:, None], np.arange(len(self.metrics))[None, :])
+        minutes = np.broadcast_to(minutes[:, None] if minutes.size > 1 else minutes, rows.shape)
+        self._push(rows.ravel(), columns.ravel(), values.ravel(), minutes.ravel())
+
+    # ----- Reads -----
+    def _select(self, array, match_ids, metric):
+        column = self.columns[metric]
+        if match_ids is None:
+            rows = np.fromiter(self.slots.values(), dtype=np.intp)
+        else:
+            rows = np.fromiter((self.slots.get(self._key(match_id), -1) for match_id in match_ids), dtype=np.intp)
+        known = rows >= 0
+        return np.where(known, array[rows, column], 0), known
+
+    def count(self, metric, match_ids=None):
+        counts, _ = self._select(self.counts, match_ids, metric)
+        return counts
+
+    def mean(self, metric, match_ids=None, default=np.nan):
+        """Mean over the window for each match, `default` where it is empty."""
+        sums, _ = self._select(self.sums, match_ids, metric)
+        counts = self.count(metric, match_ids)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), default)
+
+    def variance(self, metric, match_ids=None):
+        """Population variance over the window (NaN where empty)."""
+        squares, _ = self._select(self.squares, match_ids, metric)
+        counts = self.count(metric, match_ids)
+        mean = self.mean(metric, match_ids)
+        return np.where(counts > 0, np.maximum(squares / np.maximum(counts, 1) - mean * mean, 0.0), np.nan)
+
+    def ewma_value(self, metric, match_ids=None):
+        ewma, _ = self._select(self.ewma, match_ids, metric)
+        counts = self.count(metric, match_ids)
+        return np.where(counts > 0, ewma, np.nan)
+
+    def window(self, metric, match_id):
+        """The values currently held for one match, oldest first."""
+        row = self.slots.get(self._key(match_id))
+        if row is None:
+            return []
+        column = self.columns[metric]
+        count = self.counts[row, column]
+        start = (self.positions[row, column] - count) % self.length
+        return np.roll(self.buffers[row, column], -start)[:count].tolist()
+
+    def decayed_mean(self, metric, match_ids=None, default=np.nan):
+        """
+        Time-decayed average for each match.  Until any match time has passed
+        it is the latest value; `default` where nothing has been pushed.
+        """
+        sums, _ = self._select(self.decayed_sums, match_ids, metric)
+        weights, _ = self._select(self.decayed_weights, match_ids, metric)
+        latest, _ = self._select(self.latest, match_ids, metric)
+        counts = self.count(metric, match_ids)
+        mean = np.where(weights > 0, sums / np.where(weights > 0, weights, 1.0), latest)
+        return np.where(counts > 0, mean, default)
+
+    def expected_lambda(self, team='home', match_ids=None):
+        """
+        dynamic_expected_lambda for each match: mean xG (time-decayed when the
+        store has a timescale), 1.0 with no history.
+        """
+        metric = "home_xg" if team == 'home' else "away_xg"
+        if self.timescale is not None:
+            return self.decayed_mean(metric, match_ids, default=1.0)
+        return self.mean(metric, match_ids, default=1.0)
+
+
+class History:
+    """
+    The scripts' self.history / update_history / dynamic_expected_lambda for
+    one match, without the Tk instance around it.  Backed by a row of a
+    HistoryStore, which several History objects may share.
+    """
+
+    def __init__(self, length=10, store=None, match_id=0, timescale=None):
+        if store is None:
+            store = HistoryStore(length=length, capacity=1, timescale=timescale)
+        self.store = store
+        self.match_id = match_id
+        self.store.slot(match_id)
+
+    @property
+    def length(self):
+        return self.store.length
+
+    @property
+    def values(self):
+        return {metric: self.store.window(metric, self.match_id) for metric in self.store.metrics}
+
+    def update(self, key, value, minutes=None):
+        self.store.push([self.match_id], key, [value], minutes)
+
+    def update_state(self, state):
+        """
+        Push the HISTORY_KEYS of one match state (labels or snake_case keys),
+        or of a stack_states batch of one.
+        """
+        # A batch of one has a length-1 array for every input; anything else
+        # (an empty tick included) is a single state.
+        if not (state and all(np.shape(value) == (1,) for value in state.values())):
+            state = [state]
+        self.store.push_states([self.match_id], state)
+
+    def expected_lambda(self, team='home'):
+        """Running average of the team's xG, 1.0 when nothing has been seen yet."""
+        return float(self.store.expected_lambda(team, [self.match_id])[0])
+
+    def reset(self):
+        self.store.clear(self.match_id)
@@ -0,0 +1,209 @@
+"""
+asyncio engine that follows many matches at once.
+
+Every match gets its own LiveMatch holding what the Tk scripts keep on the
+window instance: the xG/SOT/possession history, locked profit and cumulative
+loss.  Ticks from any number of async sources are routed by their "Match Id"
+and only the match that ticked is repriced.  Each match keeps its model
+stages between ticks, so an odds-only tick skips the lambda chain and the
+score grids.
+
+    python -m odds_apex.live feed_a.jsonl feed_b.jsonl --preset lay_score
+    scraper | python -m odds_apex.live -
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from odds_apex.engine import stack_states
+from odds_apex.history import History, HistoryStore
+from odds_apex.nb import nb_pmf
+from odds_apex.pipeline import Evaluation
+from odds_apex.registry import PRESETS, evaluate_presets, timescale_groups
+from odds_apex.state import MatchState
+from odds_apex.stream import add_engine_options, dump_pmf_stats, parse_tick, pmf_option, unbatch
+from odds_apex.timing import TIMINGS
+
+MATCH_ID_KEYS = ("Match Id", "match_id")
+
+
+class LiveMatch:
+    """State carried between ticks for one fixture."""
+
+    def __init__(self, match_id, histories):
+        self.match_id = match_id
+        # {momentum timescale: History}, one per group of presets.
+        self.histories = histories
+        self.locked_profit = 0.0
+        self.cumulative_loss = 0.0
+        # Last value seen for every input, so a tick only has to carry
+        # the fields that changed.
+        self.state = MatchState()
+        self.ticks = 0
+        self.result = None
+        # Cached model stages per timescale, reused by the next tick where its
+        # inputs allow.
+        self.evaluations = {}
+
+    def apply(self, tick):
+        """Merge a tick into the match state and return the full state."""
+        state = self.state.updated({key: value for key, value in tick.items() if key not in MATCH_ID_KEYS})
+        stacked = stack_states(state, single=True)  # raises on bad values before anything is kept
+        self.state = state
+        self.locked_profit = float(stacked["locked_profit"][0])
+        self.cumulative_loss = float(stacked["cumulative_loss"][0])
+        for history in self.histories.values():
+            history.update_state(state)
+        self.ticks += 1
+        return stacked
+
+
+class LiveEngine:
+    """
+    Price ticks for many matches concurrently.
+
+    Each tick produces a {"match_id", "tick", "results"} dict, or
+    {"match_id", "tick", "error"} when the tick cannot be used (an invalid
+    match id or input, or pricing that raised).  It is passed
+    to `on_result` (e.g. a queue's put_nowait) and the latest good one is kept
+    on the match as LiveMatch.result.  `pmf` and `tail_tolerance` are as
+    for stream.price_ticks.
+    """
+
+    def __init__(self, presets=("main",), history_length=10, on_result=None, pmf=nb_pmf, tail_tolerance=None):
+        self.presets = list(presets)
+        self.on_result = on_result
+        self.pmf = pmf
+        self.tail_tolerance = tail_tolerance
+        self.matches = {}
+        self.groups = timescale_groups(self.presets)
+        # One store per momentum timescale (as backtest.replay groups the
+        # presets), each shared by every match so priors can be read for all
+        # of them at once.
+        self.stores = {timescale: HistoryStore(length=history_length, timescale=timescale) for timescale in self.groups}
+
+    def match(self, match_id):
+        live_match = self.matches.get(match_id)
+        if live_match is None:
+            histories = {timescale: History(store=store, match_id=match_id) for timescale, store in self.stores.items()}
+            live_match = self.matches[match_id] = LiveMatch(match_id, histories)
+        return live_match
+
+    def remove(self, match_id):
+        """Forget a finished match."""
+        self.matches.pop(match_id, None)
+        for store in self.stores.values():
+            store.remove(match_id)
+
+    def process(self, tick):
+        """Apply one tick to its match and reprice that match only."""
+        if isinstance(tick, Exception):
+            return self._emit({"match_id": None, "tick": None, "error": str(tick)})
+        match_id = next((tick[key] for key in MATCH_ID_KEYS if key in tick), None)
+        try:
+            hash(match_id)
+        except TypeError:
+            return self._emit({"match_id": None, "tick": None, "error": f"invalid match id: {match_id!r}"})
+        live_match = self.match(match_id)
+        TIMINGS.start()
+        try:
+            states = live_match.apply(tick)
+        except (TypeError, ValueError) as e:
+            return self._emit({"match_id": match_id, "tick": live_match.ticks + 1, "error": f"invalid input: {e}"})
+        TIMINGS.lap("fields")
+        try:
+            results = {}
+            for timescale, group in self.groups.items():
+                history = live_match.histories[timescale]
+                prior_home, prior_away = history.expected_lambda('home'), history.expected_lambda('away')
+                evaluation = live_match.evaluations.get(timescale)
+                if evaluation is None:
+                    evaluation = Evaluation(states, prior_home, prior_away, self.pmf)
+                    live_match.evaluations[timescale] = evaluation
+                results.update(evaluate_presets(states, group, prior_home, prior_away, evaluation=evaluation,
+                                                tail_tolerance=self.tail_tolerance))
+            result = unbatch({name: results[name] for name in self.presets})
+        except Exception as e:
+            # One bad match must not stop the feed.  Its cached stages may be
+            # half updated, so the next tick prices it afresh.
+            live_match.evaluations.clear()
+            return self._emit({"match_id": match_id, "tick": live_match.ticks, "error": f"pricing failed: {e}"})
+        live_match.result = result
+        TIMINGS.stop("output")
+        return self._emit({"match_id": match_id, "tick": live_match.ticks, "results": live_match.result})
+
+    def _emit(self, result):
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
+
+    async def consume(self, source):
+        """Process every tick from an async iterable of state dicts."""
+        async for tick in source:
+            self.process(tick)
+            # Let the other sources in before the next tick from this one.
+            await asyncio.sleep(0)
+
+    async def run(self, *sources):
+        """Consume all sources concurrently until every one is exhausted."""
+        await asyncio.gather(*(self.consume(source) for source in sources))
+
+
+async def read_jsonl(reader):
+    """Async source of ticks from an asyncio.StreamReader of JSONL."""
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        line = line.strip()
+        if line:
+            yield parse_tick(line)
+
+
+async def read_jsonl_file(path):
+    """Async source of ticks from a JSONL file, read off the event loop."""
+    with open(path) as lines:
+        while True:
+            line = await asyncio.to_thread(lines.readline)
+            if not line:
+                return
+            line = line.strip()
+            if line:
+                yield parse_tick(line)
+
+
+async def _stdin_reader():
+    reader = asyncio.StreamReader()
+    loop = asyncio.get_running_loop()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+async def _main(paths, presets, pmf, tail_tolerance):
+    def write(result):
+        sys.stdout.write(json.dumps(result, separators=(",", ":")))
+        sys.stdout.write("\n")
+
+    engine = LiveEngine(presets, on_result=write, pmf=pmf, tail_tolerance=tail_tolerance)
+    sources = []
+    for path in paths:
+        sources.append(read_jsonl(await _stdin_reader()) if path == "-" else read_jsonl_file(path))
+    await engine.run(*sources)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price JSONL ticks for many matches at once.")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="JSONL files, or - for stdin (default)")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS),
+                        help="model preset to run; repeat for several (default: main)")
+    add_engine_options(parser)
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args.inputs, args.preset or ["main"], pmf_option(args), args.tail_tolerance))
+    dump_pmf_stats(args)
+    if TIMINGS.enabled:
+        TIMINGS.dump()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import numpy as np
+
+
+def goal_difference_pmf(pmf_home, pmf_away):
+    """
+    Distribution of (extra home goals - extra away goals).
+
+    Convolves the home pmf with the reversed away pmf.  Index i of the last
+    axis is a difference of i - (n_away - 1), so the array runs from
+    -(n_away - 1) up to n_home - 1.  Leading axes are batch axes.
+    """
+    pmf_home = np.asarray(pmf_home, dtype=np.float64)
+    pmf_away = np.asarray(pmf_away, dtype=np.float64)
+    n_home = pmf_home.shape[-1]
+    n_away = pmf_away.shape[-1]
+    batch = np.broadcast_shapes(pmf_home.shape[:-1], pmf_away.shape[:-1])
+    diff = np.zeros(batch + (n_home + n_away - 1,))
+    for ga in range(n_away):
+        start = n_away - 1 - ga
+        diff[..., start:start + n_home] += pmf_home * pmf_away[..., ga:ga + 1]
+    return diff
+
+
+def match_odds(pmf_home, pmf_away, home_goals, away_goals):
+    """
+    Home/draw/away probabilities from the current score and the pmfs of the
+    goals still to come.
+
+    Same sums as the `if home_goals + gh > away_goals + ga` loop, read off the
+    cumulative goal-difference distribution at the current score offset:
+    home wins when the extra-goal difference exceeds away_goals - home_goals.
+    Probabilities are not renormalised; divide by their sum as the scripts do
+    if the pmfs are truncated.  Returns (home_win_prob, draw_prob, away_win_prob).
+    """
+    diff = goal_difference_pmf(pmf_home, pmf_away)
+    n_away = np.shape(pmf_away)[-1]
+    cdf = np.concatenate([np.zeros(diff.shape[:-1] + (1,)), np.cumsum(diff, axis=-1)], axis=-1)
+    length = diff.shape[-1]
+
+    # Index into cdf such that cdf[i] = P(extra difference < threshold).
+    threshold = np.asarray(away_goals) - np.asarray(home_goals)
+    below = np.clip(threshold + n_away - 1, 0, length).astype(np.intp)
+    at_or_below = np.clip(threshold + n_away, 0, length).astype(np.intp)
+    below, at_or_below = np.broadcast_arrays(below, at_or_below)
+    shape = np.broadcast_shapes(cdf.shape[:-1], below.shape)
+    cdf = np.broadcast_to(cdf, shape + cdf.shape[-1:])
+
+    away_win_prob = np.take_along_axis(cdf, np.broadcast_to(below, shape)[..., None], axis=-1)[..., 0]
+    not_home = np.take_along_axis(cdf, np.broadcast_to(at_or_below, shape)[..., None], axis=-1)[..., 0]
+    draw_prob = not_home - away_win_prob
+    home_win_prob = cdf[..., -1] - not_home
+    return home_win_prob[()], draw_prob[()], away_win_prob[()]
+
+
+def implied_probability(odds):
+    """1 / odds, or 0 where the odds are not positive (an empty form field)."""
+    odds = np.asarray(odds, dtype=np.float64)
+    return np.where(odds > 0, 1 / np.where(odds > 0, odds, 1.0), 0.0)
+
+
+def fair_odds(probability):
+    """1 / probability, or inf where the probability is not positive."""
+    probability = np.asarray(probability, dtype=np.float64)
+    return np.where(probability > 0, 1 / np.where(probability > 0, probability, 1.0), np.inf)
+
+
+def _normalise(probs):
+    total = probs[0] + probs[1] + probs[2]
+    safe_total = np.where(total > 0, total, 1.0)
+    return tuple(p / safe_total for p in probs)
+
+
+def blend_market(probs, live_odds, weight=0.7, normalise=True):
+    """
+    Blend model (home, draw, away) probabilities with the live match odds.
+
+    With `normalise` the implied market probabilities are normalised first and
+    the blend is renormalised after, as hedge.py and memory.py do;
+    lay_score_loss.py blends the raw implied probabilities and leaves the
+    result as is.
+    """
+    market = tuple(implied_probability(odds) for odds in live_odds)
+    if normalise:
+        market = _normalise(market)
+    blended = tuple(weight * p + (1 - weight) * m for p, m in zip(probs, market))
+    return _normalise(blended) if normalise else blended
+
+
+def blend_current_score(grid, market_odds_current, weight=0.7):
+    """
+    Blend grid[..., 0, 0] (no more goals) with the market's current-score odds
+    and renormalise the grid, where those odds are given (> 0).
+    """
+    grid = np.array(grid, dtype=np.float64)
+    market_odds_current = np.asarray(market_odds_current, dtype=np.float64)
+    given = market_odds_current > 0
+    grid[..., 0, 0] = np.where(
+        given, weight * grid[..., 0, 0] + (1 - weight) * implied_probability(market_odds_current), grid[..., 0, 0]
+    )
+    total = grid.sum(axis=(-2, -1))
+    scale = np.where(given & (total > 0), total, 1.0)
+    return grid / scale[..., None, None]
+
+
+def grid_outcomes(grid, home_goals, away_goals):
+    """(home_win_prob, draw_prob, away_win_prob) summed over a score grid."""
+    grid = np.asarray(grid, dtype=np.float64)
+    extra_home = np.arange(grid.shape[-2])[:, None]
+    extra_away = np.arange(grid.shape[-1])[None, :]
+    # Final goal difference for every cell, per batch row.
+    diff = (np.asarray(home_goals, dtype=np.float64)[..., None, None] + extra_home
+            - np.asarray(away_goals, dtype=np.float64)[..., None, None] - extra_away)
+    return (
+        np.where(diff > 0, grid, 0.0).sum(axis=(-2, -1))[()],
+        np.where(diff == 0, grid, 0.0).sum(axis=(-2, -1))[()],
+        np.where(diff < 0, grid, 0.0).sum(axis=(-2, -1))[()],
+    )
+
+
+def score_probability(grid, home_goals, away_goals, selected_home_goals, selected_away_goals):
+    """
+    Probability of the final score (selected_home_goals, selected_away_goals),
+    or NaN where that score is not in the grid (already passed or too far out).
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    extra_home = np.asarray(selected_home_goals) - np.asarray(home_goals)
+    extra_away = np.asarray(selected_away_goals) - np.asarray(away_goals)
+    inside = (extra_home >= 0) & (extra_home < grid.shape[-2]) & (extra_away >= 0) & (extra_away < grid.shape[-1])
+    row = np.clip(extra_home, 0, grid.shape[-2] - 1).astype(np.intp)
+    col = np.clip(extra_away, 0, grid.shape[-1] - 1).astype(np.intp)
+    flat = (row * grid.shape[-1] + col)
+    cells = grid.reshape(grid.shape[:-2] + (-1,))
+    shape = np.broadcast_shapes(cells.shape[:-1], flat.shape)
+    picked = np.take_along_axis(np.broadcast_to(cells, shape + cells.shape[-1:]),
+                                np.broadcast_to(flat, shape)[..., None], axis=-1)[..., 0]
+    return np.where(inside, picked, np.nan)[()]
@@ -0,0 +1,113 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Every script builds its grid from 0-5 extra goals per side.
+MAX_GOALS = 5
+
+# Adaptive grids drop at most this much probability mass per match.  At
+# 1e-3 a late-match side (lambda 0.1-0.3) needs 3-5 goals rather than 6,
+# while lambda 1 and up get a wider grid than 6x6, which leaves out 1% (at
+# lambda 1) to 20% (at 2.5) of the mass.  Tighter values keep late grids at
+# 6x6 or more (1e-6 gives 9x9 at lambda 0.3).  Set
+# ODDS_APEX_TAIL_TOLERANCE to change it for a deployment.
+DEFAULT_TAIL_TOLERANCE = float(os.environ.get("ODDS_APEX_TAIL_TOLERANCE", "1e-3"))
+
+# Hard ceiling on extra goals per side for adaptive grids.
+GOAL_CAP = 40
+
+AdaptiveGrid = namedtuple("AdaptiveGrid", "grid truncation_error home_goals away_goals")
+
+
+def nb_pmf(expected_lambda, r=3, max_goals=MAX_GOALS):
+    """
+    Negative Binomial predictive pmf for 0..max_goals extra goals.
+
+    Same distribution as bayesian_goal_probability in the scripts:
+        P(k) = comb(k+r-1, k) * p^r * (1-p)^k,   p = r / (r + expected_lambda)
+    but built with the ratio recurrence
+        P(k+1) = P(k) * (k + r) / (k + 1) * (1 - p)
+    so there is no comb() and only one power per match.  `expected_lambda`
+    and `r` broadcast against each other; the goal count is the last axis.
+    """
+    expected_lambda = np.asarray(expected_lambda, dtype=np.float64)
+    r = np.asarray(r, dtype=np.float64)
+    p = r / (r + expected_lambda)
+    q = 1 - p
+    pmf = np.empty(p.shape + (max_goals + 1,))
+    pmf[..., 0] = p ** r
+    for k in range(max_goals):
+        pmf[..., k + 1] = pmf[..., k] * ((k + r) / (k + 1)) * q
+    return pmf
+
+
+def outer_grid(pmf_home, pmf_away):
+    """Independent home/away pmfs -> grid[..., extra_home_goals, extra_away_goals]."""
+    return pmf_home[..., :, None] * pmf_away[..., None, :]
+
+
+def score_grid(lambda_home, lambda_away, r=3, max_goals=MAX_GOALS):
+    """
+    Probability of every (extra home goals, extra away goals) pair.
+
+    Replaces the `for gh in range(6): for ga in range(6):` loop.  Scalars give
+    a (6, 6) grid; arrays of N matches (and optionally N values of r) give
+    (N, 6, 6) in a single pass.
+    """
+    return outer_grid(nb_pmf(lambda_home, r, max_goals), nb_pmf(lambda_away, r, max_goals))
+
+
+def tail_bounded_pmf(expected_lambda, r=3, tolerance=DEFAULT_TAIL_TOLERANCE, cap=GOAL_CAP):
+    """
+    NB pmf extended only as far as needed for the tail beyond it to be at most
+    `tolerance`.
+
+    Returns (pmf, goals) where `goals` is, per match, the highest extra-goal
+    count kept (the smallest n with CDF(n) >= 1 - tolerance, capped at `cap`).
+    Entries of `pmf` past a match's own `goals` are zero, and the goal axis is
+    only as long as the widest match in the batch needs.
+    """
+    expected_lambda = np.asarray(expected_lambda, dtype=np.float64)
+    r = np.broadcast_to(np.asarray(r, dtype=np.float64), expected_lambda.shape)
+    p = r / (r + expected_lambda)
+    q = 1 - p
+    column = p ** r
+    columns = [column]
+    cdf = column.copy()
+    goals = np.zeros(expected_lambda.shape, dtype=np.intp)
+    growing = cdf < 1 - tolerance
+    k = 0
+    while k < cap and growing.any():
+        column = column * ((k + r) / (k + 1)) * q
+        k += 1
+        columns.append(np.where(growing, column, 0.0))
+        cdf = cdf + columns[-1]
+        goals = np.where(growing, k, goals)
+        growing = growing & (cdf < 1 - tolerance)
+    return np.stack(columns, axis=-1), goals
+
+
+def adaptive_score_grid(lambda_home, lambda_away, r=3, tolerance=None, cap=GOAL_CAP):
+    """
+    Score grid sized per match from a tail-mass tolerance instead of range(6).
+
+    Each side keeps enough extra goals for its NB tail to fall below
+    tolerance / 2, so the mass missing from the grid is at most `tolerance`.
+    Late in a match, when lambdas are small, that is fewer cells than the fixed
+    6x6; early on with high lambdas it grows past it so no mass is silently
+    dropped.  The default DEFAULT_TAIL_TOLERANCE trades the last 1e-3 of
+    mass for the smaller late grids; below about 4e-4 a side at lambda 0.3
+    already needs the 6 goals of the fixed grid.  Cells beyond a match's own
+    bound are left at zero.
+
+    Returns AdaptiveGrid(grid, truncation_error, home_goals, away_goals) where
+    truncation_error is the probability mass not covered by the grid.
+    """
+    if tolerance is None:
+        tolerance = DEFAULT_TAIL_TOLERANCE
+    pmf_home, home_goals = tail_bounded_pmf(lambda_home, r, tolerance / 2, cap)
+    pmf_away, away_goals = tail_bounded_pmf(lambda_away, r, tolerance / 2, cap)
+    grid = outer_grid(pmf_home, pmf_away)
+    truncation_error = np.maximum(0.0, 1 - grid.sum(axis=(-2, -1)))
+    return AdaptiveGrid(grid, truncation_error, home_goals, away_goals)
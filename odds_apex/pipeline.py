@@ -0,0 +1,250 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from odds_apex import engine, markets
+from odds_apex.engine import CHAIN_INPUTS
+from odds_apex.nb import nb_pmf, outer_grid, tail_bounded_pmf
+from odds_apex.timing import TIMINGS
+
+# (coefficient, min_decay) pairs passed to time_decay_adjustment.
+DECAY_MAIN = (0.005, 0.4)             # main.py, memory.py, hedge.py match odds
+DECAY_CORRECT_SCORE = (0.003, 0.5)    # correct-score scripts, hedge.py scoreline
+
+# Timing stage charged with each cached intermediate (see odds_apex.timing).
+STAGES = {
+    "chain": "lambda_chain",
+    "lambdas": "lambda_chain",
+    "pmfs": "pmf",
+    "grid": "grid",
+    "truncation": "grid",
+    "current_score_grid": "market_blend",
+    "selected": "grid",
+    "grid_outcomes": "grid",
+}
+
+# The stage graph: each cached stage -> (inputs it reads, stages it is built
+# from).  "prior_home"/"prior_away" stand for the history prior.  Anything
+# not listed here (market blending, the selected scoreline, staking) is cheap
+# and is recomputed on every call.
+DEPENDS = {
+    "chain": (CHAIN_INPUTS, ()),
+    "lambdas": (("prior_home", "prior_away"), ("chain",)),
+    "pmfs": ((), ("chain", "lambdas")),
+    "next_goal": (("elapsed_minutes",), ("chain",)),
+    "match_odds": (("home_goals", "away_goals"), ("pmfs",)),
+    "over": ((), ("pmfs",)),
+    "grid": ((), ("pmfs",)),
+    "truncation": ((), ("grid",)),
+    "current_score_grid": (("market_odds_current",), ("grid",)),
+    "selected": (("home_goals", "away_goals", "selected_home_goals", "selected_away_goals"),
+                 ("grid", "current_score_grid")),
+    "grid_outcomes": (("home_goals", "away_goals"), ("grid", "current_score_grid")),
+}
+
+# Every input some stage reads; update() only compares these.
+GRAPH_INPUTS = tuple(dict.fromkeys(name for inputs, _ in DEPENDS.values() for name in inputs))
+
+
+def stale_stages(changed):
+    """The stages that must be recomputed when the inputs in `changed` change."""
+    stale = {stage for stage, (inputs, _) in DEPENDS.items() if not changed.isdisjoint(inputs)}
+    grew = True
+    while grew:
+        grew = False
+        for stage, (_, parents) in DEPENDS.items():
+            if stage not in stale and not stale.isdisjoint(parents):
+                stale.add(stage)
+                grew = True
+    return stale
+
+
+class Evaluation:
+    """
+    Shared intermediates for one evaluation of a batch of match states.
+
+    Each script computes the same lambda chain two or three times per click
+    (next goal, match odds, correct score).  Here every distinct chain,
+    momentum blend and pmf is computed once, keyed by the constants that make
+    it distinct, and every market is read from those cached arrays.
+
+    `momentum` is the weight on the in-play lambda when blending with the
+    history prior: 0.5 is the (lambda + prior) / 2 used for match odds in
+    main.py, 0.7 the blend_weight of the scoreline scripts, and None means no
+    blending at all.
+
+    An Evaluation can be kept between calls: update() moves it to the next
+    states and keeps the stages none of whose inputs changed, so an odds
+    tick reuses the lambda chain and score grids of the previous one.
+
+    Score grids are the scripts' fixed 0-5 extra goals per side unless a
+    `tolerance` is given: then each side's pmf runs as far as its NB tail
+    needs to drop below tolerance / 2 (nb.tail_bounded_pmf), so late-match
+    grids shrink and early high-lambda ones grow.  A batch shares one grid
+    shape, as wide as its widest match needs (cells past a match's own bound
+    are zero), so one early, high-lambda state widens the grid of every
+    state priced with it; price such states apart when that matters.
+    Tail-bounded pmfs are computed directly, not through `pmf`.
+    """
+
+    def __init__(self, states, prior_home=1.0, prior_away=1.0, pmf=nb_pmf):
+        if not isinstance(states, Mapping) or not all(np.ndim(v) for v in states.values()):
+            states = engine.stack_states(states)
+        self.states = states
+        self.prior_home = np.asarray(prior_home, dtype=np.float64)
+        self.prior_away = np.asarray(prior_away, dtype=np.float64)
+        self.pmf = pmf
+        self._cache = {}
+
+    def update(self, states, prior_home=1.0, prior_away=1.0):
+        """
+        Move to a new batch of states (of the same size), dropping only the
+        cached stages downstream of the inputs that changed.  Returns the set
+        of stages dropped.  The states are compared with the previous call's
+        arrays, so pass new arrays rather than changing those in place.
+        """
+        if not isinstance(states, Mapping) or not all(np.ndim(v) for v in states.values()):
+            states = engine.stack_states(states)
+        prior_home = np.asarray(prior_home, dtype=np.float64)
+        prior_away = np.asarray(prior_away, dtype=np.float64)
+        old = self.states
+        # stack_states gives every column the batch size.
+        if states.keys() != old.keys() or len(next(iter(states.values()))) != len(next(iter(old.values()))):
+            stale = set(DEPENDS)
+        else:
+            # A NaN input counts as changed every time, which only costs a recompute.
+            changed = {name for name in GRAPH_INPUTS if name in states and (states[name] != old[name]).any()}
+            if not np.array_equal(prior_home, self.prior_home):
+                changed.add("prior_home")
+            if not np.array_equal(prior_away, self.prior_away):
+                changed.add("prior_away")
+            stale = stale_stages(changed)
+        for key in [key for key in self._cache if key[0] in stale]:
+            del self._cache[key]
+        self.states = states
+        self.prior_home = prior_home
+        self.prior_away = prior_away
+        return stale
+
+    def _memo(self, key, compute):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = compute()
+            TIMINGS.lap(STAGES.get(key[0], key[0]))
+            return value
+
+    # ----- Lambdas -----
+    def chain(self, decay=DECAY_MAIN):
+        return self._memo(("chain", decay), lambda: engine.lambda_chain(self.states, *decay))
+
+    def lambdas(self, decay=DECAY_MAIN, momentum=None):
+        if momentum is None:
+            return self.chain(decay)
+
+        def blend():
+            lambda_home, lambda_away = self.chain(decay)
+            return (
+                momentum * lambda_home + (1 - momentum) * self.prior_home,
+                momentum * lambda_away + (1 - momentum) * self.prior_away,
+            )
+        return self._memo(("lambdas", decay, momentum), blend)
+
+    def pmfs(self, decay=DECAY_MAIN, momentum=None, r=3, tolerance=None):
+        def build():
+            lambda_home, lambda_away = self.lambdas(decay, momentum)
+            if tolerance is None:
+                return self.pmf(lambda_home, r), self.pmf(lambda_away, r)
+            return tail_bounded_pmf(lambda_home, r, tolerance / 2)[0], tail_bounded_pmf(lambda_away, r, tolerance / 2)[0]
+        return self._memo(("pmfs", decay, momentum, r, tolerance), build)
+
+    # ----- Markets -----
+    def next_goal_probability(self, decay=DECAY_MAIN, floor=0.30, cap=0.90):
+        """Chance of another goal, clamped as in main.py (memory.py passes floor=None)."""
+        def build():
+            lambda_home, lambda_away = self.chain(decay)
+            remaining_minutes = 90 - self.states["elapsed_minutes"]
+            goal_probability = 1 - np.exp(-((lambda_home + lambda_away) * (remaining_minutes / 45.0)))
+            return np.clip(goal_probability, floor, cap)
+        return self._memo(("next_goal", decay, floor, cap), build)
+
+    def match_odds(self, decay=DECAY_MAIN, momentum=0.5, r=3):
+        """Normalised (home_win_prob, draw_prob, away_win_prob)."""
+        def build():
+            pmf_home, pmf_away = self.pmfs(decay, momentum, r)
+            probs = markets.match_odds(pmf_home, pmf_away, self.states["home_goals"], self.states["away_goals"])
+            total = probs[0] + probs[1] + probs[2]
+            safe_total = np.where(total > 0, total, 1.0)
+            return tuple(p / safe_total for p in probs)
+        return self._memo(("match_odds", decay, momentum, r), build)
+
+    def over_goals_probability(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2):
+        """Probability of at least one more goal, as in loss.py's over market."""
+        def build():
+            pmf_home, pmf_away = self.pmfs(decay, momentum, r)
+            return 1 - pmf_home[..., 0] * pmf_away[..., 0]
+        return self._memo(("over", decay, momentum, r), build)
+
+    def score_grid(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2, tolerance=None):
+        """grid[..., extra_home_goals, extra_away_goals] from the shared pmfs."""
+        return self._memo(("grid", decay, momentum, r, tolerance),
+                          lambda: outer_grid(*self.pmfs(decay, momentum, r, tolerance)))
+
+    def truncation_error(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2, tolerance=None):
+        """Probability mass score_grid leaves out (past its last row and column)."""
+        def build():
+            return np.maximum(0.0, 1 - self.score_grid(decay, momentum, r, tolerance).sum(axis=(-2, -1)))
+        return self._memo(("truncation", decay, momentum, r, tolerance), build)
+
+    def current_score_grid(self, decay=DECAY_CORRECT_SCORE, momentum=0.7, r=2, weight=0.7, tolerance=None):
+        """score_grid with the no-more-goals cell blended with the current-score market."""
+        def build():
+            grid = self.score_grid(decay, momentum, r, tolerance)
+            return markets.blend_current_score(grid, self.states["market_odds_current"], weight)
+        return self._memo(("current_score_grid", decay, momentum, r, weight, tolerance), build)
+
+    def scoreline_grid(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2, weight=None, tolerance=None):
+        """score_grid, or current_score_grid when a current-score `weight` is given."""
+        if weight is None:
+            return self.score_grid(decay, momentum, r, tolerance)
+        return self.current_score_grid(decay, momentum, r, weight, tolerance)
+
+    def selected_probability(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2, weight=None, tolerance=None):
+        """Probability of the selected scoreline off scoreline_grid."""
+        def build():
+            states = self.states
+            return markets.score_probability(
+                self.scoreline_grid(decay, momentum, r, weight, tolerance), states["home_goals"], states["away_goals"],
+                states["selected_home_goals"], states["selected_away_goals"],
+            )
+        return self._memo(("selected", decay, momentum, r, weight, tolerance), build)
+
+    def grid_outcomes(self, decay=DECAY_CORRECT_SCORE, momentum=None, r=2, weight=None, tolerance=None):
+        """(home, draw, away) summed off scoreline_grid, as lay_score_loss.py does."""
+        def build():
+            grid = self.scoreline_grid(decay, momentum, r, weight, tolerance)
+            return markets.grid_outcomes(grid, self.states["home_goals"], self.states["away_goals"])
+        return self._memo(("grid_outcomes", decay, momentum, r, weight, tolerance), build)
+
+
+def evaluate(states, decay=DECAY_MAIN, momentum=0.5, r=3, prior_home=1.0, prior_away=1.0, pmf=nb_pmf):
+    """
+    Every market off one lambda chain, as main.py/memory.py/loss.py lay them out.
+
+    Next goal, over goals and the correct-score grid come from the raw chain;
+    match odds from the same chain blended with the history prior.  Returns a
+    dict of arrays.
+    """
+    evaluation = Evaluation(states, prior_home, prior_away, pmf)
+    lambda_home, lambda_away = evaluation.chain(decay)
+    home_win_prob, draw_prob, away_win_prob = evaluation.match_odds(decay, momentum, r)
+    return {
+        "lambda_home": lambda_home,
+        "lambda_away": lambda_away,
+        "goal_probability": evaluation.next_goal_probability(decay),
+        "home_win_prob": home_win_prob,
+        "draw_prob": draw_prob,
+        "away_win_prob": away_win_prob,
+        "over_probability": evaluation.over_goals_probability(decay, None, r),
+        "score_grid": evaluation.score_grid(decay, None, r),
+    }
@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+import numpy as np
+
+from odds_apex.nb import MAX_GOALS, nb_pmf
+
+
+class PmfTable:
+    """
+    NB pmf vectors looked up from a precomputed table instead of recomputed.
+
+    Lambdas are quantized to `step` (0.001 by default) up to `max_lambda`; one
+    table of shape (max_lambda / step + 1, max_goals + 1) is built lazily per
+    shape parameter r the first time it is asked for.  Lambdas outside the
+    table, r values not in `r_values` and lookups with exact=True are computed
+    exactly and kept in a bounded LRU, so repeated identical inputs are still
+    not recomputed.
+
+    Rows returned for scalar lambdas are read-only views into the table.
+    """
+
+    def __init__(self, r_values=(2, 3), step=0.001, max_lambda=10.0, max_goals=MAX_GOALS, lru_size=4096):
+        self.r_values = tuple(r_values)
+        self.step = step
+        self.max_lambda = max_lambda
+        self.max_goals = max_goals
+        self.rows = int(round(max_lambda / step)) + 1
+        self.hits = 0
+        self.misses = 0
+        self._tables = {}
+        self._exact = lru_cache(maxsize=lru_size)(self._exact_row)
+
+    def __getstate__(self):
+        # Sent to worker processes (odds_apex.pool) as its settings only;
+        # each process builds its own tables and LRU.
+        return {"r_values": self.r_values, "step": self.step, "max_lambda": self.max_lambda,
+                "max_goals": self.max_goals, "lru_size": self._exact.cache_info().maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def table(self, r):
+        table = self._tables.get(r)
+        if table is None:
+            table = nb_pmf(np.arange(self.rows) * self.step, r, self.max_goals)
+            table.flags.writeable = False
+            self._tables[r] = table
+        return table
+
+    def _exact_row(self, expected_lambda, r):
+        row = nb_pmf(expected_lambda, r, self.max_goals)
+        row.flags.writeable = False
+        return row
+
+    def pmf(self, expected_lambda, r=3, exact=False):
+        """
+        pmf vector(s) for `expected_lambda`, which may be a scalar or an array.
+        Array input returns an array with a trailing goal axis, like nb_pmf.
+        """
+        tabled = not exact and r in self.r_values
+        if np.ndim(expected_lambda) == 0:
+            expected_lambda = float(expected_lambda)
+            if tabled and 0.0 <= expected_lambda <= self.max_lambda:
+                self.hits += 1
+                return self.table(r)[int(expected_lambda / self.step + 0.5)]
+            self.misses += 1
+            return self._exact(expected_lambda, r)
+
+        expected_lambda = np.asarray(expected_lambda, dtype=np.float64)
+        if tabled:
+            in_table = (expected_lambda >= 0.0) & (expected_lambda <= self.max_lambda)
+            # NaN and out-of-range lambdas take the exact path below; keep them out of the cast.
+            index = np.where(in_table, expected_lambda / self.step + 0.5, 0.0)
+            np.clip(index, 0, self.rows - 1, out=index)
+            out = self.table(r).take(index.astype(np.intp), axis=0)
+        else:
+            in_table = np.zeros(expected_lambda.shape, dtype=bool)
+            out = np.empty(expected_lambda.shape + (self.max_goals + 1,))
+        hits = int(np.count_nonzero(in_table))
+        self.hits += hits
+        self.misses += expected_lambda.size - hits
+        if hits < expected_lambda.size:
+            for position in zip(*np.nonzero(~in_table)):
+                out[position] = self._exact(float(expected_lambda[position]), r)
+        return out
+
+    def stats(self):
+        """Table hit/miss counters plus the state of the exact-value LRU."""
+        info = self._exact.cache_info()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "lru_hits": info.hits,
+            "lru_misses": info.misses,
+            "lru_size": info.currsize,
+            "lru_max_size": info.maxsize,
+            "tables": sorted(self._tables),
+        }
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self._exact.cache_clear()
+
+
+_default_table = None
+
+
+def default_table():
+    """
+    Process-wide PmfTable shared by the headless engine: stream, live and
+    backtest use it with --pmf-table, and dump its stats() to stderr at exit.
+    """
+    global _default_table
+    if _default_table is None:
+        _default_table = PmfTable()
+    return _default_table
@@ -0,0 +1,148 @@
+"""
+Shard large batches across processes.
+
+A batch of match states is split into contiguous chunks, each chunk is
+priced by evaluate_presets (and, for stake(), sized by stake_preset) in a
+worker process, and the pieces are joined back in input order.  Workers are
+started once and warmed up (imports and a throwaway evaluation) so the
+first real chunk does not pay for it.
+
+The evaluator's pmf is sent to each worker once, when it starts, so it
+must pickle: nb_pmf does, and so does a PmfTable's pmf.  A PmfTable pickles
+as its settings, so each worker builds its own tables once (during the
+warm-up) and keeps its own hit and miss counts; the parent's table only
+counts what is priced in-process.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from odds_apex.engine import stack_states
+from odds_apex.nb import nb_pmf
+from odds_apex.registry import PRESETS, evaluate_presets
+from odds_apex.staking import stake_preset
+
+MIN_CHUNK = 1024   # below this the pickling costs more than the maths
+CHUNKS_PER_WORKER = 4
+
+
+# The pmf of the evaluator that started this worker process.
+_worker_pmf = nb_pmf
+
+
+def _warm_up(pmf=nb_pmf):
+    global _worker_pmf
+    _worker_pmf = pmf
+    evaluate_presets([{}], list(PRESETS), pmf=pmf)
+
+
+def _price(states, names, prior_home, prior_away, pmf, tail_tolerance, stake):
+    results = evaluate_presets(states, names, prior_home, prior_away, pmf, tail_tolerance=tail_tolerance)
+    if stake:
+        return {name: stake_preset(PRESETS[name], results[name], states) for name in names}
+    return results
+
+
+def _evaluate_chunk(args):
+    states, names, prior_home, prior_away, tail_tolerance, stake = args
+    return _price(states, names, prior_home, prior_away, _worker_pmf, tail_tolerance, stake)
+
+
+def _slice(value, start, stop):
+    return value[start:stop] if np.ndim(value) else value
+
+
+def _join(pieces):
+    """Concatenate nested dicts of per-state arrays, chunk by chunk."""
+    if len(pieces) == 1:
+        return pieces[0]
+    if isinstance(pieces[0], dict):
+        return {key: _join([piece[key] for piece in pieces]) for key in pieces[0]}
+    # Tail-bounded score grids are as wide as their own chunk needs; pad
+    # with zeros as a single batch would (see pipeline.Evaluation).
+    shape = np.max([np.shape(piece) for piece in pieces], axis=0)
+    return np.concatenate([
+        np.pad(piece, [(0, 0)] + [(0, size - current) for size, current in zip(shape[1:], np.shape(piece)[1:])])
+        for piece in pieces
+    ])
+
+
+class ShardedEvaluator:
+    """
+    evaluate_presets over a process pool.
+
+    Use as a context manager, or call close() when done, so the workers are
+    shut down.  `workers` defaults to os.cpu_count(); `pmf` is the NB pmf
+    every chunk is priced with (see the module docstring).
+    """
+
+    def __init__(self, workers=None, chunk_size=None, pmf=nb_pmf):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pmf = pmf
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_warm_up, initargs=(pmf,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def chunks(self, size):
+        """
+        (start, stop) of each chunk.  Without workers a batch is priced whole
+        unless chunk_size was given, which then bounds memory in-process too.
+        """
+        if self.executor is None and self.chunk_size is None:
+            return [(0, size)]
+        chunk_size = self.chunk_size or max(MIN_CHUNK, -(-size // (self.workers * CHUNKS_PER_WORKER)))
+        return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)] or [(0, size)]
+
+    def _run(self, states, names, prior_home, prior_away, tail_tolerance, stake):
+        names = list(PRESETS) if names is None else list(names)
+        states = stack_states(states)
+        chunks = self.chunks(len(next(iter(states.values()))))
+        jobs = (
+            (
+                {key: column[start:stop] for key, column in states.items()},
+                names,
+                _slice(prior_home, start, stop),
+                _slice(prior_away, start, stop),
+                tail_tolerance,
+                stake,
+            )
+            for start, stop in chunks
+        )
+        if self.executor is None or len(chunks) == 1:
+            return _join([_price(*job[:4], self.pmf, *job[4:]) for job in jobs])
+        # map yields in submission order, so the join keeps input order.
+        return _join(list(self.executor.map(_evaluate_chunk, jobs)))
+
+    def evaluate(self, states, names=None, prior_home=1.0, prior_away=1.0, tail_tolerance=None):
+        """
+        Same arguments and result as evaluate_presets.  `prior_home` and
+        `prior_away` may be scalars or one value per state.
+        """
+        return self._run(states, names, prior_home, prior_away, tail_tolerance, stake=False)
+
+    def stake(self, states, names=None, prior_home=1.0, prior_away=1.0, tail_tolerance=None):
+        """
+        evaluate() and stake_preset in the same workers: {name: stake_preset
+        decisions} for every state, without shipping the prices back.
+        """
+        return self._run(states, names, prior_home, prior_away, tail_tolerance, stake=True)
+
+
+def evaluate_sharded(states, names=None, prior_home=1.0, prior_away=1.0, workers=None, chunk_size=None,
+                     pmf=nb_pmf, tail_tolerance=None):
+    """One-off ShardedEvaluator.evaluate; keep an evaluator around to reuse warm workers."""
+    with ShardedEvaluator(workers, chunk_size, pmf) as evaluator:
+        return evaluator.evaluate(states, names, prior_home, prior_away, tail_tolerance)
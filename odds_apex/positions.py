@@ -0,0 +1,134 @@
+"""
+Profit and loss of open positions over every final score.
+
+A Position is one matched bet: a back or lay of home, draw, away, over goals
+or a correct score, at some odds for some stake.  Any field can be an array
+over a batch of matches.  Against a score grid (grid[..., extra_home_goals,
+extra_away_goals], as Evaluation builds it) every position pays
+
+    odds - 1 per unit backed where its selection wins, -1 where it loses
+
+and a lay is a back of minus the lay stake.  So the positions make one
+(cells, positions) payoff matrix and the P&L of the whole book is that
+matrix times the signed stakes: adding a position adds a column rather than
+another branch.  scenario_pnl() returns that P&L on the grid with its
+expected value and variance under the grid's probabilities.
+
+    book = [Position("score", LAY, 9.0, 10.0, selected_home_goals=1, selected_away_goals=0),
+            Position("home", BACK, 2.2, 66.7)]
+    scenario_pnl(book, grid, home_goals=0, away_goals=0)["expected"]
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from odds_apex.staking import BACK, LAY
+
+# What a position is on:
+#
+#   home, draw, away  the match odds
+#   over              more than `line` goals in total (line=2.5 is over 2.5)
+#   score             the final score selected_home_goals-selected_away_goals
+MARKETS = ("home", "draw", "away", "over", "score")
+
+Position = namedtuple("Position", [
+    "market",
+    "side",
+    "odds",
+    "stake",
+    "selected_home_goals",
+    "selected_away_goals",
+    "line",
+])
+Position.__new__.__defaults__ = (None, None, None)
+
+
+def final_scores(home_goals, away_goals, shape):
+    """(final_home, final_away) for every cell of a grid of `shape` from the current score."""
+    home_goals = np.asarray(home_goals, dtype=np.float64)[..., None, None]
+    away_goals = np.asarray(away_goals, dtype=np.float64)[..., None, None]
+    return home_goals + np.arange(shape[0])[:, None], away_goals + np.arange(shape[1])[None, :]
+
+
+def wins(position, final_home, final_away):
+    """Where `position`'s selection wins, for every cell of final_scores()."""
+    market = position.market
+    if market == "home":
+        return final_home > final_away
+    if market == "draw":
+        return final_home == final_away
+    if market == "away":
+        return final_home < final_away
+    if market == "over":
+        return final_home + final_away > np.asarray(position.line, dtype=np.float64)[..., None, None]
+    if market == "score":
+        return ((final_home == np.asarray(position.selected_home_goals, dtype=np.float64)[..., None, None])
+                & (final_away == np.asarray(position.selected_away_goals, dtype=np.float64)[..., None, None]))
+    raise ValueError(f"unknown market {market!r}; expected one of {', '.join(MARKETS)}")
+
+
+def payoff_matrix(positions, home_goals, away_goals, shape):
+    """
+    (..., cells, positions) P&L per unit backed: odds - 1 where each
+    position's selection wins and -1 where it loses, over the cells of a grid
+    of `shape` flattened row by row.
+    """
+    final_home, final_away = final_scores(home_goals, away_goals, shape)
+    columns = []
+    for position in positions:
+        odds = np.asarray(position.odds, dtype=np.float64)[..., None, None]
+        payoff = np.where(wins(position, final_home, final_away), odds - 1, -1.0)
+        columns.append(payoff.reshape(payoff.shape[:-2] + (-1,)))
+    columns = np.broadcast_arrays(*columns)
+    return np.stack(columns, axis=-1)
+
+
+def signed_stakes(positions):
+    """(..., positions) stakes, backs positive and lays negative."""
+    stakes = [np.where(np.asarray(position.side) == LAY, -1.0, 1.0) * np.asarray(position.stake, dtype=np.float64)
+              for position in positions]
+    return np.stack(np.broadcast_arrays(*stakes), axis=-1)
+
+
+def scenario_pnl(positions, grid, home_goals, away_goals):
+    """
+    The book's P&L on every final score of `grid`; see the module docstring.
+
+    Returns a dict: pnl (shaped like the grid), expected and variance (under
+    the grid renormalised to 1, so scores off the grid are left out), and
+    worst and best (the extremes over the grid's scores).
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    shape = grid.shape[-2:]
+    if not positions:
+        pnl = np.zeros(grid.shape[:-2] + (shape[0] * shape[1],))
+    else:
+        matrix = payoff_matrix(positions, home_goals, away_goals, shape)
+        stakes = signed_stakes(positions)
+        pnl = np.matmul(matrix, stakes[..., None])[..., 0]
+    probs = grid.reshape(grid.shape[:-2] + (-1,))
+    total = probs.sum(axis=-1, keepdims=True)
+    probs = probs / np.where(total > 0, total, 1.0)
+    pnl, probs = np.broadcast_arrays(pnl, probs)
+    expected = (probs * pnl).sum(axis=-1)
+    variance = (probs * (pnl - expected[..., None]) ** 2).sum(axis=-1)
+    return {
+        "pnl": pnl.reshape(pnl.shape[:-1] + shape),
+        "expected": expected[()],
+        "variance": variance[()],
+        "worst": pnl.min(axis=-1)[()],
+        "best": pnl.max(axis=-1)[()],
+    }
+
+
+def hedge_positions(states, decisions):
+    """
+    hedge.py's book from stake_preset's decisions: the selected-scoreline
+    lay and the Home back that covers it (zero stakes where neither is bet).
+    """
+    selected, hedge = decisions["selected"], decisions["hedge_home"]
+    return [
+        Position("score", LAY, states["live_selected_odds"], np.where(selected["side"] == LAY, selected["stake"], 0.0),
+                 selected_home_goals=states["selected_home_goals"], selected_away_goals=states["selected_away_goals"]),
+        Position("home", BACK, states["live_odds_home"], np.where(hedge["side"] == BACK, hedge["stake"], 0.0)),
+    ]
@@ -0,0 +1,179 @@
+from collections import namedtuple
+
+from odds_apex import markets
+from odds_apex.history import MOMENTUM_TIMESCALE
+from odds_apex.nb import nb_pmf
+from odds_apex.pipeline import DECAY_CORRECT_SCORE, DECAY_MAIN, Evaluation
+from odds_apex.timing import TIMINGS
+
+# The constants that tell the ten scripts apart.  Each market is described by
+# the (decay, momentum, r) it is computed with; None means the script does
+# not show that market.
+#
+#   match_odds      (decay, momentum, r) for home/draw/away, or "grid" to sum
+#                   them off the correct-score grid as lay_score_loss.py does
+#   market_blend    weight on the model when blending with the live match odds
+#   normalise_market  normalise the market before blending and the result after
+#   next_goal       (floor, cap) applied to the next-goal probability
+#   correct_score   (decay, momentum, r) for the scoreline grid
+#   current_score_blend  weight on the model for the current-score cell
+#   tail_tolerance  None for the scripts' fixed 6x6 scoreline grid, or the
+#                   probability mass the grid may leave out, sizing it per
+#                   batch from the NB tails (see pipeline.Evaluation)
+#   over            (decay, momentum, r) for the "at least one more goal" market
+#   momentum_timescale  match-minute timescale of the history prior, None for
+#                   the last-10-clicks average
+#
+# and how each script sizes its bets:
+#
+#   kelly_fraction  dynamic_kelly multiplier on the edge
+#   stake_cap       clamp_to_10pct as a fraction of the bankroll, or None
+#   recovery_factor loss.py's recovery multiplier factor, or None
+#   bankroll        "account", "locked" (balance less locked profit, floored
+#                   at 0) or "nonnegative" (balance floored at 0)
+#   stake_match_odds, stake_over  place back/lay stakes on those markets
+#   strict_lay      only lay match odds when the live odds are above 1
+#   selected        bets on the selected scoreline: "both", "lay" or None
+#   hedge_home      back Home to cover the selected-scoreline lay (hedge.py)
+ModelPreset = namedtuple("ModelPreset", [
+    "name",
+    "match_odds",
+    "market_blend",
+    "normalise_market",
+    "next_goal",
+    "correct_score",
+    "current_score_blend",
+    "tail_tolerance",
+    "over",
+    "momentum_timescale",
+    "kelly_fraction",
+    "stake_cap",
+    "recovery_factor",
+    "bankroll",
+    "stake_match_odds",
+    "stake_over",
+    "strict_lay",
+    "selected",
+    "hedge_home",
+])
+ModelPreset.__new__.__defaults__ = (
+    None, None, True, None, None, None, None, None, None,
+    0.25, 0.10, None, "account", False, False, False, None, False,
+)
+
+_RAW_SCORE = (DECAY_CORRECT_SCORE, None, 2)
+_BLENDED_SCORE = (DECAY_CORRECT_SCORE, 0.7, 2)
+
+PRESETS = {preset.name: preset for preset in (
+    ModelPreset("main", match_odds=(DECAY_MAIN, 0.5, 3), next_goal=(0.30, 0.90),
+                stake_cap=None, stake_match_odds=True),
+    ModelPreset("memory", match_odds=(DECAY_MAIN, 0.5, 3), market_blend=0.7, next_goal=(None, 0.90),
+                momentum_timescale=MOMENTUM_TIMESCALE, stake_match_odds=True),
+    ModelPreset("loss", match_odds=(DECAY_CORRECT_SCORE, 0.5, 2), market_blend=0.7,
+                correct_score=_RAW_SCORE, over=_RAW_SCORE,
+                recovery_factor=0.5, stake_match_odds=True, stake_over=True),
+    ModelPreset("correct_match", match_odds=(DECAY_CORRECT_SCORE, 0.5, 2), market_blend=0.7,
+                correct_score=_RAW_SCORE,
+                recovery_factor=0.5, stake_match_odds=True, selected="both"),
+    ModelPreset("correct_score", match_odds=(DECAY_CORRECT_SCORE, 0.5, 2), market_blend=0.7,
+                correct_score=_RAW_SCORE, momentum_timescale=MOMENTUM_TIMESCALE, stake_match_odds=True),
+    ModelPreset("hedge", match_odds=(DECAY_MAIN, 0.5, 3), market_blend=0.7,
+                correct_score=_BLENDED_SCORE, current_score_blend=0.7,
+                selected="lay", hedge_home=True),
+    ModelPreset("lay_score", correct_score=_BLENDED_SCORE, current_score_blend=0.7,
+                kelly_fraction=0.125, bankroll="locked", selected="lay"),
+    ModelPreset("lay_score_loss", match_odds="grid", market_blend=0.7, normalise_market=False,
+                correct_score=_BLENDED_SCORE, current_score_blend=0.7,
+                kelly_fraction=0.125, recovery_factor=0.5, bankroll="locked", selected="lay"),
+    ModelPreset("score_expected", correct_score=_BLENDED_SCORE, current_score_blend=0.7,
+                kelly_fraction=0.125, bankroll="nonnegative", selected="lay"),
+    ModelPreset("Score_Match_Combined", match_odds=(DECAY_CORRECT_SCORE, 0.7, 3), market_blend=0.7,
+                correct_score=_BLENDED_SCORE, current_score_blend=0.7, momentum_timescale=MOMENTUM_TIMESCALE,
+                kelly_fraction=0.125, bankroll="nonnegative", stake_match_odds=True, strict_lay=True,
+                selected="lay"),
+)}
+
+
+def _evaluate_preset(evaluation, preset):
+    states = evaluation.states
+    result = {}
+
+    if preset.correct_score is not None:
+        decay, momentum, r = preset.correct_score
+        weight, tolerance = preset.current_score_blend, preset.tail_tolerance
+        result["cs_lambda_home"], result["cs_lambda_away"] = evaluation.lambdas(decay, momentum)
+        result["score_grid"] = evaluation.scoreline_grid(decay, momentum, r, weight, tolerance)
+        result["selected_prob"] = evaluation.selected_probability(decay, momentum, r, weight, tolerance)
+        if tolerance is not None:
+            result["truncation_error"] = evaluation.truncation_error(decay, momentum, r, tolerance)
+        TIMINGS.lap("grid")
+
+    if preset.match_odds == "grid":
+        probs = evaluation.grid_outcomes(*preset.correct_score, preset.current_score_blend, preset.tail_tolerance)
+    elif preset.match_odds is not None:
+        decay, momentum, r = preset.match_odds
+        result["mo_lambda_home"], result["mo_lambda_away"] = evaluation.lambdas(decay, momentum)
+        probs = evaluation.match_odds(decay, momentum, r)
+    if preset.match_odds is not None:
+        if preset.market_blend is not None:
+            live_odds = (states["live_odds_home"], states["live_odds_draw"], states["live_odds_away"])
+            probs = markets.blend_market(probs, live_odds, preset.market_blend, preset.normalise_market)
+        result["home_win_prob"], result["draw_prob"], result["away_win_prob"] = probs
+        TIMINGS.lap("market_blend")
+
+    if preset.next_goal is not None:
+        decay = preset.match_odds[0]
+        result["lambda_home"], result["lambda_away"] = evaluation.chain(decay)
+        result["goal_probability"] = evaluation.next_goal_probability(decay, *preset.next_goal)
+
+    if preset.over is not None:
+        result["over_probability"] = evaluation.over_goals_probability(*preset.over)
+    return result
+
+
+def evaluate_presets(states, names=None, prior_home=1.0, prior_away=1.0, pmf=nb_pmf, evaluation=None,
+                     tail_tolerance=None):
+    """
+    Evaluate several presets against the same batch of match states.
+
+    All presets share one Evaluation, so a lambda chain, pmf or grid used by
+    more than one variant is computed once for the whole call.  `names`
+    defaults to every preset in PRESETS.  Returns {name: dict of arrays}; the
+    keys present depend on which markets the preset shows (match-odds
+    probabilities are after any market blend, the score grid after any
+    current-score blend, and selected_prob is NaN where the selected
+    scoreline is not on the grid).
+
+    Pass the Evaluation kept from the previous call as `evaluation` to
+    reuse every stage whose inputs did not change (see Evaluation.update);
+    it keeps its own pmf.
+
+    `tail_tolerance`, when given, replaces every preset's: the scoreline
+    grids are then tail-bounded and each result gains truncation_error, the
+    probability mass its grid leaves out.
+    """
+    if evaluation is None:
+        evaluation = Evaluation(states, prior_home, prior_away, pmf)
+    else:
+        evaluation.update(states, prior_home, prior_away)
+    names = list(PRESETS) if names is None else names
+    presets = {name: PRESETS[name] for name in names}
+    if tail_tolerance is not None:
+        presets = {name: preset._replace(tail_tolerance=tail_tolerance) for name, preset in presets.items()}
+    return {name: _evaluate_preset(evaluation, preset) for name, preset in presets.items()}
+
+
+def timescale_groups(names=None):
+    """
+    {momentum_timescale: [preset names]}, in first-seen order.  Presets in
+    one group share a history prior; each group needs a history of its own.
+    """
+    groups = {}
+    for name in (list(PRESETS) if names is None else names):
+        groups.setdefault(PRESETS[name].momentum_timescale, []).append(name)
+    return groups
+
+
+def evaluate_preset(states, name, prior_home=1.0, prior_away=1.0, pmf=nb_pmf):
+    """evaluate_presets for a single preset."""
+    return evaluate_presets(states, [name], prior_home, prior_away, pmf)[name]
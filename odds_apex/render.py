@@ -0,0 +1,76 @@
+"""
+Draw a script's results into its output Text widget.
+
+compute() returns the output as a list of records.  A plain string is body
+text; header(), lay() and back() mark the lines shown in colour, so the tag
+comes from what the line is rather than from searching its wording.  The
+record types are the tag names the scripts configure:
+
+    HEADER "insight" (green), LAY "lay" (red), BACK "back" (blue),
+    TEXT "normal" (black)
+
+TextRenderer draws only what changed since its last render: lines that are
+the same are left alone and a few edited lines are replaced in place.  When
+the number of lines changes, or most of them did, everything from the first
+difference on is redrawn with a single insert call.  Nothing here imports
+tkinter; the widget only needs config(), delete() and insert().
+"""
+HEADER = "insight"
+LAY = "lay"
+BACK = "back"
+TEXT = "normal"
+
+
+def header(text):
+    return (HEADER, text)
+
+
+def lay(text):
+    return (LAY, text)
+
+
+def back(text):
+    return (BACK, text)
+
+
+def record(line):
+    """A record as (tag, text): plain strings are TEXT."""
+    return (TEXT, line) if isinstance(line, str) else line
+
+
+class TextRenderer:
+    """Keeps a Text widget showing the latest records; see the module docstring."""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.shown = []  # records currently in the widget, one per line
+
+    def render(self, records):
+        records = [record(line) for line in records]
+        shown = self.shown
+        first = 0
+        while first < min(len(records), len(shown)) and records[first] == shown[first]:
+            first += 1
+        if first == len(records) == len(shown):
+            return
+
+        changed = []
+        if len(records) == len(shown):
+            changed = [index for index in range(first, len(records)) if records[index] != shown[index]]
+        widget = self.widget
+        widget.config(state="normal")
+        # Two Tk calls per line in place, against redrawing the whole tail.
+        if changed and 2 * len(changed) <= len(records) - first:
+            for index in changed:
+                tag, text = records[index]
+                widget.delete(f"{index + 1}.0", f"{index + 1}.end")
+                widget.insert(f"{index + 1}.0", text, tag)
+        else:
+            widget.delete(f"{first + 1}.0", "end")
+            chunks = []
+            for tag, text in records[first:]:
+                chunks += [text + "\n", tag]
+            if chunks:
+                widget.insert("end", *chunks)
+        widget.config(state="disabled")
+        self.shown = records
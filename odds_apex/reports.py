@@ -0,0 +1,380 @@
+"""
+What each script shows when Calculate is clicked, without Tk.
+
+A ScriptReport holds one window's model: the history it pushes every click
+into and the cached stages of the last click.  report(state) takes the
+form's values as a MatchState (or a dict keyed by label or snake_case name)
+and returns the script's output as odds_apex.render records, so the window
+only reads the form and draws what comes back:
+
+    from odds_apex.history import History
+    from odds_apex.reports import ScriptReport
+
+    model = ScriptReport("lay_score", History())
+    for line in model.report({"Home Xg": 1.4, ..., "Selected Scoreline": "1-0"}):
+        ...
+
+Markets come from the registry presets and bets from staking.stake_preset
+(hedge.py's scenarios and optimal hedge from positions and hedging); the
+layouts below only format them the way each script always has.  This
+module (and everything it imports) must not import tkinter.
+"""
+import numpy as np
+
+from odds_apex.engine import stack_states
+from odds_apex.hedging import hedge_candidates, solve_hedge
+from odds_apex.pipeline import Evaluation
+from odds_apex.positions import final_scores, hedge_positions, scenario_pnl
+from odds_apex.registry import PRESETS, evaluate_presets
+from odds_apex.render import back, header, lay
+from odds_apex.staking import BACK, LAY, stake_preset
+from odds_apex.state import MatchState
+from odds_apex.timing import TIMINGS
+
+TOP_SCORES = 5  # scorelines listed by the correct-score scripts
+
+
+class ScriptReport:
+    """One script's model for one window; see the module docstring."""
+
+    def __init__(self, name, history):
+        self.name = name
+        self.preset = PRESETS[name]
+        self.history = history
+        self.evaluation = None
+
+    def price(self, state):
+        """
+        Push a MatchState into the history and price it: returns (states,
+        result, bets) for a batch of one, as stack_states, evaluate_presets
+        and stake_preset give them.
+        """
+        states = stack_states(state, single=True)
+        TIMINGS.lap("fields")
+        self.history.update_state(states)
+        TIMINGS.lap("history")
+        prior_home, prior_away = self.history.expected_lambda('home'), self.history.expected_lambda('away')
+        if self.evaluation is None:
+            self.evaluation = Evaluation(states, prior_home, prior_away)
+        result = evaluate_presets(states, [self.name], prior_home, prior_away, evaluation=self.evaluation)[self.name]
+        return states, result, stake_preset(self.preset, result, states)
+
+    def report(self, state):
+        """The script's output records for one set of form values."""
+        TIMINGS.start()
+        if not isinstance(state, MatchState):
+            state = MatchState.from_fields(state)
+        states, result, bets = self.price(state)
+        records = LAYOUTS[self.name](state, _scalars(states), _scalars(result),
+                                     {market: _scalars(bet) for market, bet in bets.items()})
+        TIMINGS.stop("report")
+        return records
+
+    def reset(self):
+        """Reset Fields: forget the history and the cached stages."""
+        self.history.reset()
+        self.evaluation = None
+
+
+def _scalars(arrays):
+    """A dict of batch-of-one arrays -> Python values (the score grid as nested lists)."""
+    return {key: np.asarray(value)[0].tolist() for key, value in arrays.items()}
+
+
+# ----- Shared sections -----
+def _fair(probability):
+    return 1 / probability if probability > 0 else float('inf')
+
+
+def _bet_line(label, bet, compact=False):
+    """The back/lay/no-edge line every script prints for a market."""
+    if compact:  # Score_Match_Combined.py
+        if bet["side"] == LAY:
+            return lay(f"Lay {label}: Edge {bet['edge']:.2%}, Liability {bet['liability']:.2f}, Stake {bet['stake']:.2f}")
+        if bet["side"] == BACK:
+            return back(f"Back {label}: Edge {bet['edge']:.2%}, Stake {bet['stake']:.2f}, Profit {bet['profit']:.2f}")
+    else:
+        if bet["side"] == LAY:
+            return lay(f"Lay {label}: Edge: {bet['edge']:.2%}, Liability: {bet['liability']:.2f}, "
+                       f"Lay Stake: {bet['stake']:.2f}")
+        if bet["side"] == BACK:
+            return back(f"Back {label}: Edge: {bet['edge']:.2%}, Stake: {bet['stake']:.2f}, Profit: {bet['profit']:.2f}")
+    return f"{label}: No clear edge."
+
+
+def _match_odds(s, result, bets, compact=False):
+    fair = [_fair(result[key]) for key in ("home_win_prob", "draw_prob", "away_win_prob")]
+    lines = [
+        f"Fair Odds - Home: {fair[0]:.2f}, Draw: {fair[1]:.2f}, Away: {fair[2]:.2f}",
+        f"Live Odds - Home: {s['live_odds_home']:.2f}, Draw: {s['live_odds_draw']:.2f}, Away: {s['live_odds_away']:.2f}",
+    ]
+    if bets:
+        lines += [_bet_line(label, bets[market], compact) for market, label in (
+            ("home", "Home"), ("draw", "Draw"), ("away", "Away"))]
+    return lines
+
+
+def _next_goal(result):
+    goal_probability = result["goal_probability"]
+    if goal_probability < 0.40:
+        level, expected_goals_range = "Low", "0 to 1"
+    elif 0.40 <= goal_probability <= 0.60:
+        level, expected_goals_range = "Medium", "1 to 2"
+    else:
+        level, expected_goals_range = "High", "2+"
+    return [
+        header("--- Next Goal Insights ---"),
+        f"Goal Probability: {goal_probability:.2%}",
+        f"Expected Goals: {expected_goals_range} ({level})",
+    ]
+
+
+def _top_scores(s, result):
+    """The TOP_SCORES most likely final scores, ties in the scripts' dict order."""
+    home_goals, away_goals = int(s["home_goals"]), int(s["away_goals"])
+    scores = [
+        ((home_goals + gh, away_goals + ga), prob)
+        for gh, row in enumerate(result["score_grid"]) for ga, prob in enumerate(row)
+    ]
+    return sorted(scores, key=lambda item: item[1], reverse=True)[:TOP_SCORES]
+
+
+def _scoreline_lines(s, result, fair_odds=True):
+    lines = []
+    for score, prob in _top_scores(s, result):
+        suffix = f" (Fair Odds: {_fair(prob):.2f})" if fair_odds else ""
+        lines.append(f"Scoreline {score[0]}-{score[1]}: {prob:.2%}{suffix}")
+    return lines
+
+
+def _selected(s, result):
+    """(home, away, probability) of the selected scoreline, or None when it is not on the grid."""
+    prob = result["selected_prob"]
+    if np.isnan(prob):
+        return None
+    return int(s["selected_home_goals"]), int(s["selected_away_goals"]), prob
+
+
+def _selected_lay(s, result, bets, no_edge="No lay edge found (fair odds not higher than live odds)."):
+    """The lay-only scripts' selected-scoreline section."""
+    lines = [header("--- Selected Scoreline Lay Recommendation ---")]
+    selected = _selected(s, result)
+    if selected is None:
+        return lines + ["Selected scoreline not found in calculated probabilities."]
+    home, away, prob = selected
+    lines.append(f"Selected Scoreline {home}-{away}: Probability: {prob:.2%}, Fair Odds: {_fair(prob):.2f}")
+    bet = bets["selected"]
+    if bet["side"] == LAY:
+        lines.append(lay(f"Recommended Lay Bet: Edge: {bet['edge']:.2%}, Liability: {bet['liability']:.2f}, "
+                         f"Lay Stake: {bet['stake']:.2f}"))
+    else:
+        lines.append(no_edge)
+    return lines
+
+
+def _expected_goals(result):
+    home, away = result["cs_lambda_home"], result["cs_lambda_away"]
+    return [
+        header("--- Expected Goals Betting Insights ---"),
+        f"Expected Goals Left - Home: {home:.2f}",
+        f"Expected Goals Left - Away: {away:.2f}",
+        f"Total Expected Goals Left: {home + away:.2f}",
+    ]
+
+
+def _position_label(position):
+    if position.market == "score":
+        return f"Correct Score {int(position.selected_home_goals)}-{int(position.selected_away_goals)}"
+    if position.market == "over":
+        return f"Over {position.line:g} Goals"
+    return position.market.capitalize()
+
+
+def _sections(*sections):
+    """Join sections the way the scripts build combined_lines: a blank line after each."""
+    lines = []
+    for section in sections:
+        lines.extend(section)
+        lines.append("")
+    return lines
+
+
+# ----- One layout per script -----
+def _main(state, s, result, bets):
+    return _sections(_next_goal(result), [header("--- Match Odds Calculation ---")] + _match_odds(s, result, bets))
+
+
+def _correct_score(state, s, result, bets):
+    return _sections(
+        [header("--- Next Correct Scoreline Insights ---")] + _scoreline_lines(s, result, fair_odds=False),
+        [header("--- Match Odds Calculation ---")] + _match_odds(s, result, bets),
+    )
+
+
+def _loss(state, s, result, bets):
+    fair_over = _fair(result["over_probability"])
+    return _correct_score(state, s, result, bets) + _sections([
+        header("--- Over Goals Fair Odds Calculation ---"),
+        f"Fair Odds Over: {fair_over:.2f}",
+        f"Live Odds Over: {s['live_next_goal_odds']:.2f}",
+        _bet_line("Over", bets["over"]),
+    ])
+
+
+def _correct_match(state, s, result, bets):
+    lines = [header("--- Selected Scoreline Bet Recommendation ---")]
+    selected = _selected(s, result)
+    if selected is None:
+        lines.append("Selected scoreline not found in calculated probabilities.")
+    else:
+        home, away, prob = selected
+        lines.append(f"Selected Scoreline {home}-{away}: Probability: {prob:.2%}, Fair Odds: {_fair(prob):.2f}")
+        bet = bets["selected"]
+        if s["live_selected_odds"] <= 0:
+            lines.append("Live odds for selected scoreline not provided or invalid.")
+        elif bet["side"] == LAY:
+            lines.append(lay(f"Recommended Bet: Lay {home}-{away}: Edge: {bet['edge']:.2%}, "
+                             f"Liability: {bet['liability']:.2f}, Lay Stake: {bet['stake']:.2f}"))
+        elif bet["side"] == BACK:
+            lines.append(back(f"Recommended Bet: Back {home}-{away}: Edge: {bet['edge']:.2%}, "
+                              f"Stake: {bet['stake']:.2f}, Profit: {bet['profit']:.2f}"))
+        else:
+            lines.append("No clear edge for selected scoreline.")
+    return _sections(
+        [header("--- Next Correct Scoreline Insights ---")] + _scoreline_lines(s, result),
+        [header("--- Match Odds Calculation ---")] + _match_odds(s, result, bets),
+        lines,
+    )
+
+
+def _hedge(state, s, result, bets):
+    # A) Match odds, for information only.
+    lines_mo = [header("--- Match Odds Calculation (Info Only) ---")] + _match_odds(s, result, None)
+    for key, odds, label in (("home_win_prob", "live_odds_home", "Home"), ("draw_prob", "live_odds_draw", "Draw"),
+                             ("away_win_prob", "live_odds_away", "Away")):
+        fair, live = _fair(result[key]), s[odds]
+        if fair < live:
+            lines_mo.append(f"Potential value BACKING {label} (live odds {live:.2f} vs fair {fair:.2f}).")
+        elif fair > live:
+            lines_mo.append(f"Potential value LAYING {label} (live odds {live:.2f} vs fair {fair:.2f}).")
+        else:
+            lines_mo.append(f"No edge found for {label}.")
+
+    # B) Correct score and the selected-scoreline lay.
+    lines_cs = [header("--- Scoreline Probability Insights ---"), "Top 5 Scorelines by Probability:"]
+    for score, prob in _top_scores(s, result):
+        lines_cs.append(f"  {score[0]}-{score[1]}: {prob:.2%} (Fair: {_fair(prob):.2f})")
+    lines_cs += ["", header("--- Selected Scoreline Lay ---")]
+    selected = _selected(s, result)
+    cs_bet = bets["selected"]
+    if selected is None:
+        lines_cs.append("Selected scoreline not found in the probability distribution.")
+    else:
+        home, away, prob = selected
+        lines_cs.append(f"Selected Scoreline {home}-{away}: Probability {prob:.2%}, Fair Odds {_fair(prob):.2f}")
+        if cs_bet["side"] == LAY:
+            lines_cs.append(lay(f"Recommended Lay Bet: Edge {cs_bet['edge']:.2%}, Liability {cs_bet['liability']:.2f}, "
+                                f"Lay Stake {cs_bet['stake']:.2f}"))
+        else:
+            lines_cs.append("No lay edge found (fair odds not higher than live odds).")
+
+    # C) Back Home to cover the lay.
+    selected_score_str = (state.selected_scoreline or "").strip()
+    live_odds_home = s["live_odds_home"]
+    cs_liability = cs_bet["liability"]
+    hedge_stake = bets["hedge_home"]["stake"]
+    lines_hedge = [header("--- Hedging Recommendation ---")]
+    if bets["hedge_home"]["side"] == BACK:
+        lines_hedge.append(back(f"To offset liability {cs_liability:.2f} on score {selected_score_str}, "
+                                f"consider backing Home at {live_odds_home:.2f} for stake {hedge_stake:.2f}."))
+        lines_hedge.append(f"This yields a profit of {hedge_stake * (live_odds_home - 1):.2f} if Home wins.")
+    else:
+        lines_hedge.append("No hedge recommended (no liability or invalid Home odds).")
+
+    # D) Net result of the lay plus the hedge on every final score of the grid.
+    grid = np.asarray(result["score_grid"])
+    scenarios = scenario_pnl(hedge_positions(s, bets), grid, s["home_goals"], s["away_goals"])
+    final_home, final_away = final_scores(s["home_goals"], s["away_goals"], grid.shape)
+    pnl = scenarios["pnl"]
+    lines_scenarios = [header("--- Scenario Outcome Table (Lay + Hedge) ---")]
+    is_selected = np.zeros(grid.shape, dtype=bool)
+    if selected is not None:
+        is_selected = (final_home == selected[0]) & (final_away == selected[1])
+        lines_scenarios.append(f"If the final score is {selected_score_str}: {pnl[is_selected][0]:.2f}")
+    for label, outcome in (("Home wins", final_home > final_away), ("Away wins", final_home < final_away),
+                           ("Draw", final_home == final_away)):
+        cells = pnl[outcome & ~is_selected]
+        if cells.size == 0:
+            continue
+        suffix = f" but not {selected_score_str}" if is_selected[outcome].any() else ""
+        low, high = cells.min(), cells.max()
+        value = f"{low:.2f}" if f"{low:.2f}" == f"{high:.2f}" else f"{low:.2f} to {high:.2f}"
+        lines_scenarios.append(f"If {label}{suffix}: {value}")
+    lines_scenarios.append(f"Expected P&L: {scenarios['expected']:.2f} "
+                           f"(Std Dev {np.sqrt(scenarios['variance']):.2f}, Worst {scenarios['worst']:.2f})")
+
+    # E) The lay hedged across every market with odds, for the best worst case.
+    book = hedge_positions(s, bets)[:1]
+    solved = solve_hedge(book, hedge_candidates(s), grid, s["home_goals"], s["away_goals"])
+    lines_optimal = [header("--- Optimal Hedge (Best Worst Case) ---")]
+    for position in solved["hedge"]:
+        if position.stake >= 0.005:
+            lines_optimal.append(back(f"Back {_position_label(position)} at {position.odds:.2f} "
+                                      f"for stake {position.stake:.2f}."))
+    if len(lines_optimal) == 1:
+        lines_optimal.append("No hedge improves the worst case.")
+    else:
+        lay_only = scenario_pnl(book, grid, s["home_goals"], s["away_goals"])
+        lines_optimal.append(f"Worst case {lay_only['worst']:.2f} -> {solved['worst']:.2f}, "
+                             f"Expected P&L {solved['expected']:.2f}")
+    return _sections(lines_mo, lines_cs, lines_hedge, lines_scenarios, lines_optimal)
+
+
+def _lay_score(state, s, result, bets):
+    return _sections(
+        [header("--- Scoreline Probability Insights ---")] + _scoreline_lines(s, result),
+        _selected_lay(s, result, bets),
+    )
+
+
+def _lay_score_loss(state, s, result, bets):
+    lines_match = [header("--- Match Odds Betting Insights ---")]
+    rows = (("home_win_prob", "live_odds_home", "Home Win"), ("draw_prob", "live_odds_draw", "Draw"),
+            ("away_win_prob", "live_odds_away", "Away Win"))
+    for key, odds, label in rows:
+        lines_match.append(f"{label}: Fair Odds {_fair(result[key]):.2f} | Live Odds {s[odds]:.2f}")
+    for key, odds, label in rows:
+        fair, live = _fair(result[key]), s[odds]
+        if live > 0 and fair > live:
+            lines_match.append(lay(f"--> Value to Lay {label} (Edge: {(fair - live) / fair:.2%})"))
+    return _sections(
+        lines_match,
+        [header("--- Scoreline Probability Insights ---")] + _scoreline_lines(s, result),
+        _selected_lay(s, result, bets,
+                      "No lay edge found for selected scoreline (fair odds not higher than live odds)."),
+    )
+
+
+def _score_expected(state, s, result, bets):
+    return _sections(_expected_goals(result)) + _lay_score(state, s, result, bets)
+
+
+def _score_match_combined(state, s, result, bets):
+    return _sections(
+        [header("--- Match Odds Calculation ---")] + _match_odds(s, result, bets, compact=True),
+        _expected_goals(result),
+    ) + _lay_score(state, s, result, bets)
+
+
+LAYOUTS = {
+    "main": _main,
+    "memory": _main,
+    "loss": _loss,
+    "correct_match": _correct_match,
+    "correct_score": _correct_score,
+    "hedge": _hedge,
+    "lay_score": _lay_score,
+    "lay_score_loss": _lay_score_loss,
+    "score_expected": _score_expected,
+    "Score_Match_Combined": _score_match_combined,
+}
@@ -0,0 +1,183 @@
+"""
+The scripts' Kelly back/lay sizing, vectorised over a batch of matches.
+"""
+import numpy as np
+
+from odds_apex.markets import fair_odds
+from odds_apex.timing import TIMINGS
+
+BACK = 1
+LAY = -1
+NO_BET = 0
+
+
+def kelly(edge, fraction=0.25):
+    """dynamic_kelly: fraction * edge floored at 0 (NaN edges stake nothing, as max(0, nan) does)."""
+    kelly_fraction = fraction * np.asarray(edge, dtype=np.float64)
+    return np.where(kelly_fraction > 0, kelly_fraction, 0.0)
+
+
+def recovery_multiplier(cumulative_loss, account_balance, factor):
+    """loss.py's 1 + |cumulative loss| / balance * factor, or 1 without a positive balance."""
+    account_balance = np.asarray(account_balance, dtype=np.float64)
+    safe_balance = np.where(account_balance > 0, account_balance, 1.0)
+    return np.where(account_balance > 0, 1 + (np.abs(cumulative_loss) / safe_balance) * factor, 1.0)
+
+
+def decide(fair_odds, live_odds, bankroll, kelly_fraction=0.25, cap=None, multiplier=1.0,
+           sides="both", strict_lay=False, require_live=False):
+    """
+    The scripts' back/lay block, for arrays of matches and markets.
+
+    Lays when the fair odds are above the live odds (and, with strict_lay,
+    the live odds are above 1 as Score_Match_Combined.py requires), backs
+    when they are below; sides="lay" never backs.  require_live skips
+    matches without live odds > 0, as the selected-scoreline blocks do.  The
+    Kelly amount is scaled by `multiplier` and, with `cap`, clamped to
+    cap * bankroll.  NaN fair odds never bet.
+
+    Every argument broadcasts, so a (matches, markets) grid of odds is sized
+    in one call: give bankroll and multiplier a trailing axis of 1 and
+    sides, strict_lay and require_live one entry per market.
+
+    Returns a dict of arrays: side (BACK, LAY or NO_BET), edge, stake (back
+    stake or lay stake), liability (what is lost if the bet loses) and
+    profit (what is won if it wins).
+    """
+    fair_odds, live_odds, bankroll = np.broadcast_arrays(
+        np.asarray(fair_odds, dtype=np.float64),
+        np.asarray(live_odds, dtype=np.float64),
+        np.asarray(bankroll, dtype=np.float64),
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lay = (fair_odds > live_odds) & (~np.asarray(strict_lay, dtype=bool) | (live_odds > 1))
+        back = ~lay & (fair_odds < live_odds) & (np.asarray(sides) != "lay")
+        live = ~np.asarray(require_live, dtype=bool) | (live_odds > 0)
+        lay &= live
+        back &= live
+        # (inf - live) / inf is NaN in the scripts too, and stakes nothing.
+        safe_fair = np.where(np.isfinite(fair_odds), fair_odds, np.nan)
+        edge = np.where(lay, (fair_odds - live_odds) / safe_fair, np.where(back, (live_odds - fair_odds) / safe_fair, 0.0))
+
+        amount = bankroll * kelly(edge, kelly_fraction) * multiplier
+        if cap is not None:
+            amount = np.minimum(amount, bankroll * cap)
+        price = live_odds - 1
+        lay_stake = np.where(price > 0, amount / np.where(price > 0, price, 1.0), 0.0)
+
+    side = np.where(lay, LAY, np.where(back, BACK, NO_BET))
+    return {
+        "side": side,
+        "edge": edge,
+        "stake": np.where(lay, lay_stake, np.where(back, amount, 0.0)),
+        "liability": np.where(lay, amount, np.where(back, amount, 0.0)),
+        "profit": np.where(lay, lay_stake, np.where(back, amount * price, 0.0)),
+    }
+
+
+def settle(decision, won):
+    """
+    P&L of each decision given whether its selection won (a lay profits when
+    the selection loses).
+    """
+    won = np.asarray(won, dtype=bool)
+    side = decision["side"]
+    selection_pnl = np.where(won, decision["profit"], -decision["liability"])
+    lay_pnl = np.where(won, -decision["liability"], decision["profit"])
+    return np.where(side == BACK, selection_pnl, np.where(side == LAY, lay_pnl, 0.0))
+
+
+# ----- Presets -----
+MATCH_ODDS_MARKETS = (
+    ("home", "home_win_prob", "live_odds_home"),
+    ("draw", "draw_prob", "live_odds_draw"),
+    ("away", "away_win_prob", "live_odds_away"),
+)
+
+
+def bankroll(preset, states):
+    """The balance a preset stakes from: its effective_balance."""
+    balance = states["account_balance"]
+    if preset.bankroll == "locked":
+        return np.maximum(balance - states["locked_profit"], 0.0)
+    if preset.bankroll == "nonnegative":
+        return np.maximum(balance, 0.0)
+    return balance
+
+
+def _fair(probability):
+    # NaN (selected scoreline not on the grid) stays NaN so it never bets.
+    probability = np.asarray(probability, dtype=np.float64)
+    return np.where(np.isnan(probability), np.nan, fair_odds(probability))
+
+
+def stake_markets(preset, result, states):
+    """
+    Size every market a preset's script stakes, for every match, in one
+    decide() call.
+
+    `result` is the preset's evaluate_presets output for `states`.  Returns
+    (markets, decision): the market names, in the order "home", "draw",
+    "away", "over", "selected" (those the script stakes), and a decide()
+    dict of (matches, markets) arrays.
+    """
+    markets, fair, live, sides, strict, require_live = [], [], [], [], [], []
+
+    def add(market, probability, odds, market_sides="both", market_strict=False, market_require_live=False):
+        markets.append(market)
+        fair.append(_fair(probability))
+        live.append(np.broadcast_to(states[odds], np.shape(probability)))
+        sides.append(market_sides)
+        strict.append(market_strict)
+        require_live.append(market_require_live)
+
+    if preset.stake_match_odds:
+        for market, probability, odds in MATCH_ODDS_MARKETS:
+            add(market, result[probability], odds, market_strict=preset.strict_lay)
+    if preset.stake_over:
+        add("over", result["over_probability"], "live_next_goal_odds")
+    if preset.selected is not None:
+        add("selected", result["selected_prob"], "live_selected_odds", preset.selected, market_require_live=True)
+    if not markets:
+        return markets, None
+
+    multiplier = 1.0
+    if preset.recovery_factor is not None:
+        multiplier = recovery_multiplier(states["cumulative_loss"], states["account_balance"], preset.recovery_factor)
+    decision = decide(
+        np.stack(fair, axis=-1), np.stack(live, axis=-1), np.asarray(bankroll(preset, states))[..., None],
+        preset.kelly_fraction, preset.stake_cap, np.asarray(multiplier)[..., None],
+        sides=np.array(sides), strict_lay=np.array(strict), require_live=np.array(require_live),
+    )
+    return markets, decision
+
+
+def stake_preset(preset, result, states):
+    """
+    Every bet a preset's script would recommend for a batch of states.
+
+    `result` is the preset's evaluate_presets output for `states`.  Returns
+    {market: decide() dict} for the markets the script stakes: "home",
+    "draw", "away", "over", "selected" and, for hedge.py, "hedge_home" (a
+    back of Home sized to cover the selected-scoreline liability).  The
+    markets are sized together by stake_markets.
+    """
+    markets, decision = stake_markets(preset, result, states)
+    decisions = {
+        market: {key: value[..., column] for key, value in decision.items()}
+        for column, market in enumerate(markets)
+    }
+    if preset.hedge_home:
+        liability = decisions["selected"]["liability"]
+        odds = np.broadcast_to(states["live_odds_home"], liability.shape)
+        hedge = (liability > 0) & (odds > 1.01)
+        stake = np.where(hedge, liability / np.where(hedge, odds - 1, 1.0), 0.0)
+        decisions["hedge_home"] = {
+            "side": np.where(hedge, BACK, NO_BET),
+            "edge": np.zeros_like(stake),
+            "stake": stake,
+            "liability": stake,
+            "profit": np.where(hedge, liability, 0.0),
+        }
+    TIMINGS.lap("kelly")
+    return decisions
@@ -0,0 +1,141 @@
+"""
+Match states as compact records.
+
+MatchState is one match's inputs: a __slots__ record with one attribute per
+input (engine.FIELDS, by snake_case name) instead of a dict of Tk
+variables.  The form is read into one on the Tk thread, and from then on
+the worker, the history and the engine only touch plain Python values.  It
+is an immutable read-only mapping, so anything that takes a state dict
+(stack_states, History.update_state) takes a MatchState too, and two reads
+of an unchanged form compare equal.
+
+MatchBatch is the structure-of-arrays form of many states: one float64
+column per engine.INPUTS name, ready for Evaluation and evaluate_presets.
+
+    state = MatchState.from_fields({"Home Xg": 1.2, "Selected Scoreline": "1-0"})
+    state.home_xg                          # 1.2
+    state.to_fields(["Home Xg", "Away Xg"])   # {"Home Xg": 1.2, "Away Xg": 0.0}
+    batch = MatchBatch.from_states([state, state.updated({"Away Xg": 0.8})])
+    batch["away_xg"]                       # array([0. , 0.8])
+"""
+from collections.abc import Mapping
+
+from odds_apex.engine import FIELDS, SCORELINE_COLUMNS, field_name, stack_states
+
+# Every input, in form order; all numeric except the scoreline text, which
+# is None until one is given (stack_states then leaves its columns at 0).
+NAMES = tuple(dict.fromkeys(FIELDS.values()))
+TEXT = "selected_scoreline"
+_NAMES = frozenset(NAMES)
+
+
+def _inputs(fields):
+    """{name: value} for the keys of `fields` that are inputs, by label or name."""
+    values = {}
+    for key, value in fields.items():
+        name = field_name(key)
+        if name in _NAMES:
+            values[name] = value
+    return values
+
+
+class MatchState(Mapping):
+    """One match's inputs; see the module docstring.  Missing inputs are 0.0."""
+
+    __slots__ = NAMES
+
+    def __init__(self, **values):
+        for name in NAMES:
+            object.__setattr__(self, name, values.pop(name, None if name == TEXT else 0.0))
+        if values:
+            raise TypeError(f"unknown match inputs: {', '.join(sorted(values))}")
+
+    @classmethod
+    def from_fields(cls, fields):
+        """
+        A state from form values keyed by label ("Home Xg") or snake_case
+        name.  Keys that are not inputs are ignored, as stack_states does.
+        """
+        return cls(**_inputs(fields))
+
+    def updated(self, fields):
+        """A copy with `fields` (labels or names) applied; unknown keys are ignored."""
+        values = {name: getattr(self, name) for name in NAMES}
+        values.update(_inputs(fields))
+        return MatchState(**values)
+
+    def to_fields(self, labels):
+        """{label: value} for the labels of a form, to write back into its variables."""
+        fields = {label: getattr(self, field_name(label)) for label in labels}
+        return {label: "" if value is None else value for label, value in fields.items()}
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MatchState is immutable; use updated()")
+
+    # ----- Mapping -----
+    def __getitem__(self, key):
+        name = field_name(key)
+        if name not in _NAMES:
+            raise KeyError(key)
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter(NAMES)
+
+    def __len__(self):
+        return len(NAMES)
+
+    def __eq__(self, other):
+        if not isinstance(other, MatchState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in NAMES)
+
+    __hash__ = None
+
+    def __repr__(self):
+        changed = ", ".join(f"{name}={getattr(self, name)!r}" for name in NAMES
+                            if getattr(self, name) not in (0, "", None))
+        return f"MatchState({changed})"
+
+
+class MatchBatch(Mapping):
+    """
+    Many states as columns: a read-only mapping of engine.INPUTS name to a
+    float64 array, with the selected scoreline as SCORELINE_COLUMNS.
+    """
+
+    __slots__ = ("columns", "size")
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.size = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_states(cls, states):
+        """Stack MatchStates (or state dicts) into columns."""
+        return cls(stack_states(list(states)))
+
+    def state(self, index):
+        """Row `index` as a MatchState (an unparsed scoreline comes back as "")."""
+        values = {name: column[index].item() for name, column in self.columns.items()
+                  if name not in SCORELINE_COLUMNS}
+        home, away = (int(self.columns[name][index]) for name in SCORELINE_COLUMNS)
+        values[TEXT] = f"{home}-{away}" if home >= 0 and away >= 0 else ""
+        return MatchState.from_fields(values)
+
+    def states(self):
+        return [self.state(index) for index in range(self.size)]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    # ----- Mapping -----
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
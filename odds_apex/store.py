@@ -0,0 +1,152 @@
+"""
+HistoryStore kept in a memory-mapped file.
+
+The file is a fixed 512-byte header followed by one fixed-size record per
+match row:
+
+    header   magic b"OAHIST02", metric count, window length, row capacity,
+             EWMA alpha, decay timescale (NaN for none), then the metric
+             names (comma separated)
+    record   match id (64 bytes, UTF-8), ring buffers (metrics x length
+             float64), the STATS arrays (float64 per metric), counts,
+             positions (int64 per metric)
+
+Opening maps the file as is, with no parsing, so a restarted or crashed
+process picks up exactly where it stopped.  Any number of processes may open
+the same file read-only while one process writes; readers call refresh() to
+see matches added since they opened it.
+"""
+import os
+import struct
+
+import numpy as np
+
+from odds_apex.history import COUNTERS, HISTORY_KEYS, STATS, HistoryStore
+
+# memory.py keeps its history beside the scripts, wherever it is started
+# from, so a restart finds the same file; set ODDS_APEX_HISTORY_FILE to move
+# it.  Both are made absolute here, before anything can change directory.
+_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.abspath(os.environ.get("ODDS_APEX_HISTORY_FILE", os.path.join(_SCRIPTS_DIR, "memory_history.dat")))
+
+MAGIC = b"OAHIST02"
+HEADER_SIZE = 512
+_HEADER = struct.Struct("<8sqqqdd")
+ID_SIZE = 64
+
+
+def record_dtype(metrics, length):
+    count = len(metrics)
+    return np.dtype(
+        [("match_id", "S%d" % ID_SIZE), ("buffers", "<f8", (count, length))]
+        + [(name, "<f8", (count,)) for name in STATS]
+        + [(name, "<i8", (count,)) for name in COUNTERS]
+    )
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    magic, count, length, capacity, alpha, timescale = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an odds_apex history file (or is an older layout)")
+    names = header[_HEADER.size:].rstrip(b"\0").decode("utf-8")
+    timescale = None if np.isnan(timescale) else timescale
+    return tuple(names.split(",")), length, capacity, alpha, timescale
+
+
+def _write_header(f, metrics, length, capacity, alpha, timescale):
+    names = ",".join(metrics).encode("utf-8")
+    if _HEADER.size + len(names) > HEADER_SIZE:
+        raise ValueError("too many metrics for the history file header")
+    f.seek(0)
+    timescale = np.nan if timescale is None else timescale
+    f.write(_HEADER.pack(MAGIC, len(metrics), length, capacity, alpha, timescale) + names)
+
+
+class MappedHistoryStore(HistoryStore):
+    """
+    HistoryStore whose arrays live in the file at `path`.
+
+    An existing file is reopened with its own metrics, length, alpha and
+    timescale (the arguments only apply when creating it).  Match ids are stored as text, so
+    they come back as str after a reopen.  readonly=True maps the file
+    without write access, for processes that only read priors.
+    """
+
+    def __init__(self, path, metrics=HISTORY_KEYS, length=10, capacity=64, alpha=0.3, timescale=None,
+                 readonly=False):
+        self.path = path
+        self.readonly = readonly
+        if os.path.exists(path):
+            metrics, length, capacity, alpha, timescale = _read_header(path)
+        elif readonly:
+            raise FileNotFoundError(path)
+        self.records = None
+        super().__init__(metrics, length, capacity, alpha, timescale)
+        self._load_slots()
+
+    def _allocate(self, capacity):
+        dtype = record_dtype(self.metrics, self.length)
+        if not self.readonly:
+            if self.records is not None:
+                self.records.flush()
+            mode = "r+b" if os.path.exists(self.path) else "w+b"
+            with open(self.path, mode) as f:
+                _write_header(f, self.metrics, self.length, capacity, self.alpha, self.timescale)
+                f.truncate(HEADER_SIZE + capacity * dtype.itemsize)
+        self.records = np.memmap(
+            self.path, dtype=dtype, mode="r" if self.readonly else "r+", offset=HEADER_SIZE, shape=(capacity,)
+        )
+        # Field views write straight through to the mapped file.
+        for name in ("buffers",) + STATS + COUNTERS:
+            setattr(self, name, self.records[name])
+
+    def _load_slots(self):
+        ids = self.records["match_id"]
+        used = np.flatnonzero(ids != b"")
+        self.slots = {ids[row].decode("utf-8"): int(row) for row in used}
+        top = int(used[-1]) + 1 if used.size else 0
+        self._free = sorted(set(range(top)) - set(self.slots.values()), reverse=True)
+
+    def _key(self, match_id):
+        return str(match_id)
+
+    def slot(self, match_id):
+        if self.readonly:
+            row = self.slots.get(self._key(match_id))
+            if row is None:
+                raise KeyError(match_id)
+            return row
+        if self._key(match_id) in self.slots:
+            return self.slots[self._key(match_id)]
+        encoded = self._key(match_id).encode("utf-8")
+        if len(encoded) > ID_SIZE:
+            raise ValueError(f"match id longer than {ID_SIZE} bytes: {match_id!r}")
+        row = super().slot(match_id)
+        self.records["match_id"][row] = encoded
+        return row
+
+    def remove(self, match_id):
+        row = self.slots.get(self._key(match_id))
+        super().remove(match_id)
+        if row is not None:
+            self.records["match_id"][row] = b""
+
+    def refresh(self):
+        """Pick up rows and capacity changes written by another process."""
+        capacity = _read_header(self.path)[2]
+        if capacity != self.records.shape[0]:
+            self._allocate(capacity)
+        self._load_slots()
+
+    def flush(self):
+        """Push dirty pages to disk (the OS does this anyway; this waits for it)."""
+        if not self.readonly:
+            self.records.flush()
+
+    def close(self):
+        self.flush()
+        self.records = None
+        for name in ("buffers",) + STATS + COUNTERS:
+            setattr(self, name, None)
@@ -0,0 +1,168 @@
+"""
+Headless tick processor.
+
+Reads newline-delimited JSON match states (keyed by the form labels, e.g.
+"Home Xg", "Elapsed Minutes") and writes one JSON result per line:
+
+    python -m odds_apex.stream ticks.jsonl --preset main --preset lay_score
+    scraper | python -m odds_apex.stream - > prices.jsonl
+
+Every stage is a generator, so memory stays flat however long the feed is.
+"""
+import argparse
+import json
+import math
+import sys
+
+import numpy as np
+
+from odds_apex.engine import stack_states
+from odds_apex.history import History
+from odds_apex.nb import DEFAULT_TAIL_TOLERANCE, nb_pmf
+from odds_apex.pipeline import Evaluation
+from odds_apex.pmf_cache import default_table
+from odds_apex.registry import PRESETS, evaluate_presets, timescale_groups
+from odds_apex.timing import TIMINGS
+
+
+def parse_tick(line):
+    """One JSONL line -> state dict, or a ValueError describing what is wrong."""
+    try:
+        state = json.loads(line)
+    except ValueError as e:
+        return ValueError(f"invalid JSON: {e}")
+    if not isinstance(state, dict):
+        return ValueError("tick is not a JSON object")
+    return state
+
+
+def read_ticks(lines):
+    """Yield (tick_number, state_or_error) for every non-blank line."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield number, parse_tick(line)
+
+
+def plain(value):
+    """numpy results -> JSON-safe Python values; NaN and inf become null."""
+    value = np.asarray(value)
+    if value.ndim:
+        return [plain(item) for item in value]
+    value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def unbatch(results):
+    """evaluate_presets output for a batch of one -> plain JSON-ready values."""
+    return {
+        name: {key: plain(np.asarray(value)[0]) for key, value in result.items()}
+        for name, result in results.items()
+    }
+
+
+def price_ticks(ticks, presets=("main",), histories=None, history_length=10, pmf=nb_pmf, tail_tolerance=None):
+    """
+    Price each tick with the named presets, updating the match history first
+    the way calculate_all does.  Presets with different momentum timescales
+    keep separate histories ({timescale: History}, built here unless given),
+    so each is priced with the prior its script would use.  Model stages are
+    kept from tick to tick and only those downstream of changed inputs are
+    recomputed.  `pmf` is the NB pmf the model uses (a PmfTable's pmf to
+    read them from its table); `tail_tolerance` sizes the scoreline grids
+    from their NB tails instead of 6x6 (see evaluate_presets).  Yields one
+    result dict per tick; ticks that fail to parse or price yield
+    {"tick": n, "error": message} instead.
+    """
+    groups = timescale_groups(presets)
+    if histories is None:
+        histories = {timescale: History(history_length, timescale=timescale) for timescale in groups}
+    evaluations = {}
+    for number, state in ticks:
+        if isinstance(state, Exception):
+            yield {"tick": number, "error": str(state)}
+            continue
+        TIMINGS.start()
+        try:
+            states = stack_states(state, single=True)
+        except (TypeError, ValueError) as e:
+            yield {"tick": number, "error": f"invalid input: {e}"}
+            continue
+        TIMINGS.lap("fields")
+        try:
+            for history in histories.values():
+                history.update_state(states)
+            TIMINGS.lap("history")
+            results = {}
+            for timescale, group in groups.items():
+                history = histories[timescale]
+                prior_home, prior_away = history.expected_lambda('home'), history.expected_lambda('away')
+                if timescale not in evaluations:
+                    evaluations[timescale] = Evaluation(states, prior_home, prior_away, pmf)
+                results.update(evaluate_presets(states, group, prior_home, prior_away,
+                                                evaluation=evaluations[timescale], tail_tolerance=tail_tolerance))
+            results = unbatch({name: results[name] for name in presets})
+        except Exception as e:
+            # As LiveEngine.process: report the tick and price the next one
+            # afresh, since the cached stages may be half updated.
+            evaluations.clear()
+            yield {"tick": number, "error": f"pricing failed: {e}"}
+            continue
+        TIMINGS.stop("output")
+        yield {"tick": number, "results": results}
+
+
+def write_results(results, out):
+    for result in results:
+        out.write(json.dumps(result, separators=(",", ":")))
+        out.write("\n")
+
+
+def run(lines, out, presets=("main",), pmf=nb_pmf, tail_tolerance=None):
+    write_results(price_ticks(read_ticks(lines), presets, pmf=pmf, tail_tolerance=tail_tolerance), out)
+
+
+def add_engine_options(parser):
+    """The model options shared by stream, live and backtest."""
+    parser.add_argument("--pmf-table", action="store_true",
+                        help="read NB pmfs from the quantized PmfTable; its hit/miss counts go to stderr at exit")
+    parser.add_argument("--tail-tolerance", type=float, nargs="?", const=DEFAULT_TAIL_TOLERANCE,
+                        help="size scoreline grids so they leave out at most this probability mass "
+                             f"(default without a value: {DEFAULT_TAIL_TOLERANCE:g}, from ODDS_APEX_TAIL_TOLERANCE) "
+                             "instead of the fixed 6x6")
+
+
+def pmf_option(args):
+    """The pmf chosen by --pmf-table."""
+    return default_table().pmf if args.pmf_table else nb_pmf
+
+
+def dump_pmf_stats(args, out=None):
+    """Write the PmfTable's counters to `out` (stderr) when --pmf-table was given."""
+    if args.pmf_table:
+        out = out or sys.stderr
+        out.write(f"pmf table: {json.dumps(default_table().stats())}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price JSONL match-state ticks.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file, or - for stdin (default)")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS),
+                        help="model preset to run; repeat for several (default: main)")
+    add_engine_options(parser)
+    args = parser.parse_args(argv)
+    presets = args.preset or ["main"]
+    if args.input == "-":
+        run(sys.stdin, sys.stdout, presets, pmf_option(args), args.tail_tolerance)
+    else:
+        with open(args.input) as lines:
+            run(lines, sys.stdout, presets, pmf_option(args), args.tail_tolerance)
+    dump_pmf_stats(args)
+    if TIMINGS.enabled:
+        TIMINGS.dump()
+
+
+if __name__ == "__main__":
+    main()
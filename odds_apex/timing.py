@@ -0,0 +1,164 @@
+"""
+Opt-in per-stage timing for calculate_all and the headless engine.
+
+A calculation is one tick: start() opens it, lap(stage) charges the time
+since the previous mark to `stage`, stop() closes it.  A stage lapped
+several times in one tick (the scripts run the lambda chain once per
+market) is summed, so every stage gets one sample per tick.  The last
+WINDOW samples of each stage are kept for percentiles and histograms.
+
+The open tick belongs to the thread that started it, so the worker thread
+can time a calculation while the Tk thread records timed() drawing and
+reads the stats for F9; the recorded samples are shared behind a lock.
+
+Timing is off unless ODDS_APEX_TIMING=1 is set (or TIMINGS.enabled is set
+to True); then start() does nothing and every lap() returns at once:
+
+    ODDS_APEX_TIMING=1 python loss.py     # F9 in the window dumps the breakdown
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+WINDOW = 1024  # ticks kept per stage
+
+# Histogram bin edges in microseconds.
+BINS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+class StageTimer:
+    """Rolling per-stage timings; see the module docstring."""
+
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.samples = {}   # stage -> ring buffer of nanoseconds
+        self.counts = {}    # stage -> ticks recorded so far
+        self._lock = threading.Lock()       # guards samples and counts
+        self._local = threading.local()     # each thread's open tick and last mark
+
+    # ----- Recording -----
+    def start(self):
+        """Open a tick (a no-op while disabled)."""
+        if self.enabled:
+            self._local.tick = {}
+            self._local.last = time.perf_counter_ns()
+
+    def lap(self, stage):
+        """Charge the time since the last mark to `stage`."""
+        local = self._local
+        if getattr(local, "last", None) is None:
+            return
+        now = time.perf_counter_ns()
+        local.tick[stage] = local.tick.get(stage, 0) + now - local.last
+        local.last = now
+
+    def stop(self, stage=None):
+        """Close the tick, lapping `stage` first if given, and record it."""
+        local = self._local
+        if getattr(local, "last", None) is None:
+            return
+        if stage is not None:
+            self.lap(stage)
+        tick, local.tick, local.last = local.tick, None, None
+        tick["total"] = sum(tick.values())
+        with self._lock:
+            for name, elapsed in tick.items():
+                self._record(name, elapsed)
+
+    def timed(self, stage, function, *args):
+        """
+        function(*args), its time recorded under `stage` on its own rather
+        than as part of a tick (for work on another thread, such as drawing
+        results that a worker computed).
+        """
+        if not self.enabled:
+            return function(*args)
+        start = time.perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            with self._lock:
+                self._record(stage, elapsed)
+
+    def _record(self, stage, elapsed):
+        # Called with the lock held.
+        buffer = self.samples.get(stage)
+        if buffer is None:
+            buffer = self.samples[stage] = np.zeros(self.window, dtype=np.int64)
+            self.counts[stage] = 0
+        buffer[self.counts[stage] % self.window] = elapsed
+        self.counts[stage] += 1
+
+    def reset(self):
+        """Drop every recorded sample and the calling thread's open tick."""
+        with self._lock:
+            self.samples.clear()
+            self.counts.clear()
+        self._local.tick = self._local.last = None
+
+    # ----- Reading -----
+    def values(self, stage):
+        """The stage's samples in the window, in microseconds."""
+        with self._lock:
+            return self._values(stage)
+
+    def _values(self, stage):
+        # Called with the lock held; the division copies out of the ring buffer.
+        count = min(self.counts.get(stage, 0), self.window)
+        return self.samples[stage][:count] / 1e3 if count else np.zeros(0)
+
+    def histogram(self, stage):
+        """Counts of the windowed samples per BINS_US bin (last bin open-ended)."""
+        edges = np.asarray((0,) + BINS_US + (np.inf,))
+        return np.histogram(self.values(stage), edges)[0]
+
+    def stats(self):
+        """{stage: ticks, mean/p50/p90/p99/max in us, share of the total} over the window."""
+        with self._lock:
+            counts = dict(self.counts)
+            samples = {stage: self._values(stage) for stage in counts}
+        totals = samples.get("total", np.zeros(0))
+        total_mean = totals.mean() if totals.size else 0.0
+        result = {}
+        for stage, values in samples.items():
+            result[stage] = {
+                "ticks": counts[stage],
+                "mean_us": float(values.mean()),
+                "p50_us": float(np.percentile(values, 50)),
+                "p90_us": float(np.percentile(values, 90)),
+                "p99_us": float(np.percentile(values, 99)),
+                "max_us": float(values.max()),
+                "share": float(values.sum() / values.size / total_mean) if total_mean else 0.0,
+            }
+        return result
+
+    def report(self):
+        """Per-stage breakdown and histograms as text."""
+        stats = self.stats()
+        if not stats:
+            return "No timings recorded (set ODDS_APEX_TIMING=1 to enable).\n"
+        lines = [f"{'stage':16s} {'ticks':>7s} {'mean us':>10s} {'p50':>10s} {'p90':>10s} {'p99':>10s} "
+                 f"{'max':>10s} {'share':>6s}"]
+        for stage, row in sorted(stats.items(), key=lambda item: item[0] == "total"):
+            lines.append(f"{stage:16s} {row['ticks']:7d} {row['mean_us']:10.1f} {row['p50_us']:10.1f} "
+                         f"{row['p90_us']:10.1f} {row['p99_us']:10.1f} {row['max_us']:10.1f} {row['share']:6.1%}")
+        labels = [f"<{edge}" for edge in BINS_US] + [f">={BINS_US[-1]}"]
+        lines.append("")
+        lines.append(f"{'histogram (us)':16s} " + " ".join(f"{label:>7s}" for label in labels))
+        for stage in stats:
+            lines.append(f"{stage:16s} " + " ".join(f"{count:7d}" for count in self.histogram(stage)))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, out=None):
+        """Write report() to `out` (default stderr)."""
+        out = out or sys.stderr
+        out.write(self.report())
+        out.flush()
+
+
+TIMINGS = StageTimer(enabled=os.environ.get("ODDS_APEX_TIMING") == "1")
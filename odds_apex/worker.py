@@ -0,0 +1,178 @@
+"""
+Run calculations off the Tk thread.
+
+Tk widgets and variables may only be used from the thread running mainloop,
+so a Calculate click is split in three: the field values are read on the Tk
+thread, the model runs on a worker thread, and the result is handed to a
+callback back on the Tk thread, which picks it up by polling with
+root.after.  LiveRecalculator adds a live mode on top: edits to the form
+schedule a recalculation once they stop for a moment.  Nothing here imports
+tkinter; `root` only needs after() and after_cancel().
+"""
+import queue
+import sys
+import threading
+
+from odds_apex.timing import TIMINGS
+
+POLL_MS = 15
+DEBOUNCE_MS = 300  # quiet time after the last edit before a live recalculation
+
+
+class BackgroundCalculator:
+    """
+    One worker thread for one window.
+
+    submit(compute, values, on_result) runs compute(values) on the worker
+    and on_result(result) on the Tk thread.  A job submitted while an older
+    one is still waiting replaces it, and the result of a job superseded
+    while it ran is dropped, so only the latest click is shown.  `status`
+    (e.g. a ttk.Label) shows `busy_text` while a result is outstanding.
+
+    `lock` is held while a job runs: take it before changing state the jobs
+    use, such as the history, from the Tk thread.
+    """
+
+    def __init__(self, root, status=None, busy_text="Calculating..."):
+        self.root = root
+        self.status = status
+        self.busy_text = busy_text
+        self.busy = False
+        self.lock = threading.Lock()
+        self.results = queue.Queue()
+        self._wake = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._polling = False
+        self._thread = threading.Thread(target=self._work, name="calculator", daemon=True)
+        self._thread.start()
+
+    # ----- Tk thread -----
+    def submit(self, compute, values, on_result):
+        with self._wake:
+            self._generation += 1
+            self._pending = (self._generation, compute, values, on_result)
+            self._wake.notify()
+        self._set_busy(True)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        """Forget the waiting job and drop the result of the running one."""
+        with self._wake:
+            self._generation += 1
+            self._pending = None
+        self._set_busy(False)
+
+    def deliver(self):
+        """Pass every finished result to its callback."""
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self._handle(item)
+
+    def join(self, timeout=None):
+        """Block until the latest job's result has been delivered (for scripts and tests)."""
+        while self.busy:
+            self._handle(self.results.get(timeout=timeout))
+
+    def _poll(self):
+        self.deliver()
+        if self.busy:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _handle(self, item):
+        generation, on_result, result, error = item
+        if generation != self._generation:
+            return
+        self._set_busy(False)
+        if error is not None:
+            report = getattr(self.root, "report_callback_exception", None)
+            if report is None:
+                raise error[1].with_traceback(error[2])
+            report(*error)
+        else:
+            TIMINGS.timed("output", on_result, result)
+
+    def _set_busy(self, busy):
+        self.busy = busy
+        if self.status is not None:
+            self.status.config(text=self.busy_text if busy else "")
+
+    # ----- Worker thread -----
+    def _work(self):
+        while True:
+            with self._wake:
+                while self._pending is None:
+                    self._wake.wait()
+                generation, compute, values, on_result = self._pending
+                self._pending = None
+            with self.lock:
+                if generation != self._generation:
+                    continue  # cancelled before it started
+                try:
+                    result, error = compute(values), None
+                except Exception:
+                    result, error = None, sys.exc_info()
+            self.results.put((generation, on_result, result, error))
+
+
+class LiveRecalculator:
+    """
+    Live mode for a form: recalculate when the fields change.
+
+    Every write to one of `variables` (Tk variables, traced with trace_add)
+    restarts a `delay_ms` timer, so a burst of edits - typing "2.35", or
+    pasting a row of odds - ends in a single recalculation.  When the timer
+    fires, read() parses the form and recalculate(values) is called, unless
+    an entry does not parse yet (read() raised) or the values are the ones
+    last calculated.  Whoever calls recalculate directly (the Calculate
+    button) should store its values in `last_values` too.
+    """
+
+    def __init__(self, root, variables, read, recalculate, delay_ms=DEBOUNCE_MS):
+        self.root = root
+        self.read = read
+        self.recalculate = recalculate
+        self.delay_ms = delay_ms
+        self.enabled = False
+        self.last_values = None
+        self._after = None
+        for var in variables:
+            var.trace_add("write", self.changed)
+
+    def set_enabled(self, enabled):
+        """Turn live mode on (catching up with the form at once) or off."""
+        self.enabled = bool(enabled)
+        if self.enabled:
+            self.changed()
+        else:
+            self.cancel()
+
+    def changed(self, *args):
+        """Trace callback: (re)start the timer."""
+        if not self.enabled:
+            return
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+        self._after = self.root.after(self.delay_ms, self._fire)
+
+    def cancel(self):
+        """Forget a scheduled recalculation."""
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+
+    def _fire(self):
+        self._after = None
+        try:
+            values = self.read()
+        except Exception:
+            return  # half-typed entry (TclError); the next edit schedules again
+        if values != self.last_values:
+            self.recalculate(values)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from odds_apex.backtest import replay, summarise
+from odds_apex.bench import synthetic_states
+from odds_apex.staking import BACK, LAY, NO_BET, settle
+from odds_apex.state import MatchBatch
+
+FINALS = {"a": (2, 1), "b": (0, 0), "c": (1, 3)}
+SELECTED = {"a": (2, 1), "b": (2, 1), "c": (1, 3)}
+
+
+def test_settle_back_and_lay():
+    decision = {
+        "side": np.array([BACK, BACK, LAY, LAY, NO_BET]),
+        "profit": np.array([15.0, 15.0, 10.0, 10.0, 7.0]),
+        "liability": np.array([10.0, 10.0, 25.0, 25.0, 7.0]),
+    }
+    won = [True, False, True, False, True]
+    assert settle(decision, won).tolist() == [15.0, -10.0, -25.0, 10.0, 0.0]
+
+
+def _snapshots():
+    """Four snapshots for each of three matches, newest first; the final score is on one of each."""
+    states = synthetic_states(12, seed=3)
+    snapshots = []
+    for number, state in enumerate(MatchBatch(states).states()):
+        state = dict(state.items())
+        match_id = "abc"[number % 3]
+        state["elapsed_minutes"] = 10.0 + 20 * (number // 3)
+        state["home_goals"] = state["away_goals"] = 0
+        state["selected_home_goals"], state["selected_away_goals"] = SELECTED[match_id]
+        state["Match Id"] = match_id
+        if number // 3 == 2:
+            state["Final Home Goals"], state["Final Away Goals"] = FINALS[match_id]
+        snapshots.append(state)
+    return snapshots[::-1]
+
+
+def test_replay_settles_against_the_final_score():
+    replayed = replay(_snapshots(), ["main", "lay_score"], bankroll=1000.0)
+    assert replayed["match_id"].tolist() == ["a"] * 4 + ["b"] * 4 + ["c"] * 4
+    assert replayed["elapsed_minutes"].tolist() == [10.0, 30.0, 50.0, 70.0] * 3
+    final_home, final_away = np.array([FINALS[match_id] for match_id in replayed["match_id"]]).T
+    selected = np.array([FINALS[match_id] == SELECTED[match_id] for match_id in replayed["match_id"]])
+    won = {
+        "home": final_home > final_away,
+        "draw": final_home == final_away,
+        "away": final_home < final_away,
+        "over": final_home + final_away > 0,
+        "selected": selected,
+    }
+    bets = 0
+    for name, markets in replayed["presets"].items():
+        for market, decision in markets.items():
+            for side, profit, liability, pnl, selection_won in zip(
+                    decision["side"], decision["profit"], decision["liability"], decision["pnl"], won[market]):
+                if side == NO_BET:
+                    assert pnl == 0.0
+                    continue
+                bets += 1
+                # A back wins with its selection, a lay when it loses.
+                assert pnl == (profit if selection_won == (side == BACK) else -liability), (name, market)
+    assert bets
+
+
+def test_missing_final_score():
+    snapshots = [snapshot for snapshot in _snapshots() if not (
+        snapshot["Match Id"] == "b" and "Final Home Goals" in snapshot)]
+    with pytest.raises(ValueError, match="'b' has no final score"):
+        replay(snapshots, ["main"])
+
+
+def test_summarise_totals():
+    decision = {
+        "side": np.array([BACK, LAY, NO_BET, BACK]),
+        "stake": np.array([10.0, 5.0, 3.0, 20.0]),
+        "liability": np.array([10.0, 15.0, 3.0, 20.0]),
+        "pnl": np.array([12.0, -15.0, 0.0, -20.0]),
+    }
+    summary = summarise({"presets": {"main": {"home": decision, "draw": decision}, "none": {}}})
+    assert summary["main"]["home"] == {
+        "bets": 3, "staked": 35.0, "risked": 45.0, "pnl": -23.0, "roi": -23.0 / 45.0, "hit_rate": 1 / 3,
+    }
+    assert summary["main"]["total"]["bets"] == 6
+    assert summary["main"]["total"]["pnl"] == -46.0
+    assert summary["none"] == {}
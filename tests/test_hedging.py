@@ -0,0 +1,97 @@
+import itertools
+
+import numpy as np
+
+from odds_apex.hedging import solve_hedge
+from odds_apex.positions import Position, payoff_matrix, scenario_pnl
+from odds_apex.staking import BACK, LAY
+
+
+def _match(seed):
+    """A 3x3 grid from 0-0, a correct-score lay and match-odds candidates."""
+    rng = np.random.default_rng(seed)
+    grid = rng.uniform(0.01, 1.0, (3, 3))
+    grid /= grid.sum()
+    book = [Position("score", LAY, rng.uniform(4, 12), rng.uniform(5, 20), selected_home_goals=1, selected_away_goals=0)]
+    candidates = [Position(market, BACK, rng.uniform(1.5, 6), 0.0) for market in ("home", "draw", "away")]
+    return grid, book, candidates
+
+
+def _best_worst_case(base, payoff, cap):
+    """max over stakes in [0, cap] of min(base + payoff @ stakes), by trying every vertex."""
+    k = payoff.shape[1]
+    rows = [np.append(row, -1.0) for row in payoff]
+    rhs = list(-base)
+    for column in range(k):
+        unit = np.zeros(k + 1)
+        unit[column] = 1
+        rows += [unit, unit]
+        rhs += [0.0, cap[column]]
+    rows, rhs = np.array(rows), np.array(rhs)
+    best = -np.inf
+    for basis in itertools.combinations(range(len(rows)), k + 1):
+        matrix = rows[list(basis)]
+        if abs(np.linalg.det(matrix)) < 1e-12:
+            continue
+        solution = np.linalg.solve(matrix, rhs[list(basis)])
+        stakes, worst = solution[:k], solution[k]
+        if (stakes < -1e-9).any() or (stakes > cap + 1e-9).any() or (base + payoff @ stakes < worst - 1e-7).any():
+            continue
+        best = max(best, worst)
+    return best
+
+
+def test_worst_case_is_optimal():
+    for seed in range(5):
+        grid, book, candidates = _match(seed)
+        hedged = solve_hedge(book, candidates, grid, 0, 0)
+        before = scenario_pnl(book, grid, 0, 0)
+        base = before["pnl"].reshape(-1)
+        payoff = payoff_matrix(candidates, 0, 0, grid.shape)
+        span = before["best"] - before["worst"]
+        cap = np.array([span / (candidate.odds - 1) for candidate in candidates])
+        assert (hedged["stakes"] >= -1e-9).all() and (hedged["stakes"] <= cap + 1e-9).all()
+        assert abs(hedged["worst"] - _best_worst_case(base, payoff, cap)) < 1e-4 * span
+        assert hedged["worst"] >= before["worst"]
+
+
+def test_batch_matches_single_solves():
+    matches = [_match(seed) for seed in range(4)]
+    grid = np.stack([grid for grid, _, _ in matches])
+    book = [Position("score", LAY, np.array([b[0].odds for _, b, _ in matches]),
+                     np.array([b[0].stake for _, b, _ in matches]), selected_home_goals=1, selected_away_goals=0)]
+    candidates = [Position(market, BACK, np.array([c[column].odds for _, _, c in matches]), 0.0)
+                  for column, market in enumerate(("home", "draw", "away"))]
+    batched = solve_hedge(book, candidates, grid, np.zeros(4), np.zeros(4))
+    for index, (single_grid, single_book, single_candidates) in enumerate(matches):
+        single = solve_hedge(single_book, single_candidates, single_grid, 0, 0)
+        assert np.allclose(batched["stakes"][index], single["stakes"], atol=1e-6)
+
+
+def test_variance_hits_its_target_and_is_minimal():
+    grid, book, candidates = _match(7)
+    before = scenario_pnl(book, grid, 0, 0)
+    target = before["expected"] - 1.0
+    hedged = solve_hedge(book, candidates, grid, 0, 0, objective="variance", target=target)
+    assert abs(hedged["expected"] - target) < 1e-9
+    assert hedged["variance"] <= before["variance"]
+
+    # Any other stakes with the same expected P&L have at least this variance.
+    probs = grid.reshape(-1)
+    payoff = payoff_matrix(candidates, 0, 0, grid.shape)
+    mean = probs @ payoff
+    base = before["pnl"].reshape(-1)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        direction = rng.normal(size=3)
+        direction -= mean * (direction @ mean) / (mean @ mean)
+        pnl = base + payoff @ (hedged["stakes"] + direction)
+        assert abs(probs @ pnl - target) < 1e-9
+        assert probs @ (pnl - target) ** 2 >= hedged["variance"] - 1e-9
+
+
+def test_nothing_to_hedge_stakes_nothing():
+    grid, book, candidates = _match(3)
+    book = [book[0]._replace(stake=0.0)]
+    hedged = solve_hedge(book, candidates, grid, 0, 0)
+    assert (hedged["stakes"] == 0).all() and hedged["worst"] == 0
@@ -0,0 +1,76 @@
+import numpy as np
+
+from odds_apex.engine import stack_states
+from odds_apex.history import History, HistoryStore
+from odds_apex.stream import price_ticks
+
+
+def test_empty_state_is_one_state():
+    history = History(timescale=15.0)
+    history.update_state({})
+    assert history.store.count("home_xg", [0])[0] == 1
+    assert history.expected_lambda('home') == 0.0
+
+
+def test_batch_of_one_matches_state():
+    state = {"Home Xg": 1.4, "Away Xg": 0.6, "Elapsed Minutes": 30}
+    from_state, from_batch = History(), History()
+    from_state.update_state(state)
+    from_batch.update_state(stack_states(state))
+    assert from_state.expected_lambda('home') == from_batch.expected_lambda('home') == 1.4
+    assert np.array_equal(from_state.store.buffers, from_batch.store.buffers)
+
+
+def test_empty_tick_is_priced():
+    results = list(price_ticks([(1, {}), (2, {"Home Xg": 1.2})], presets=("main", "memory")))
+    assert [result["tick"] for result in results] == [1, 2]
+    assert all("results" in result for result in results)
+
+
+def test_decayed_prior_restarts_when_the_clock_goes_back():
+    history = History(timescale=15.0)
+    for minute in range(0, 95, 5):
+        history.update_state({"Home Xg": 2.5, "Elapsed Minutes": minute})
+    assert history.expected_lambda('home') == 2.5
+    # A new match in the same row: the old match's xG no longer counts.
+    for minute in (0, 5, 10):
+        history.update_state({"Home Xg": 0.3, "Elapsed Minutes": minute})
+        assert abs(history.expected_lambda('home') - 0.3) < 1e-12
+
+
+def test_decayed_prior_lags_one_tick():
+    history = History(timescale=15.0)
+    history.update_state({"Home Xg": 1.0, "Elapsed Minutes": 10})
+    history.update_state({"Home Xg": 2.0, "Elapsed Minutes": 20})
+    # 2.0 has not been held for any time yet.
+    assert history.expected_lambda('home') == 1.0
+    history.update_state({"Home Xg": 2.0, "Elapsed Minutes": 30})
+    assert 1.0 < history.expected_lambda('home') < 2.0
+
+
+def test_ring_buffer_statistics_after_wrap_around():
+    rng = np.random.default_rng(4)
+    store = HistoryStore(metrics=("home_xg",), length=4, capacity=1, alpha=0.5)
+    seen, ewma = [], None
+    for step in range(11):
+        # Large values make a drifting running sum show.
+        value = 1e6 + rng.normal()
+        store.push(["m"], "home_xg", [value])
+        seen.append(value)
+        ewma = value if ewma is None else 0.5 * value + 0.5 * ewma
+        window = seen[-4:]
+        assert store.window("home_xg", "m") == window
+        assert store.count("home_xg", ["m"])[0] == len(window)
+        assert np.isclose(store.mean("home_xg", ["m"])[0], np.mean(window), rtol=0, atol=1e-9)
+        assert np.isclose(store.variance("home_xg", ["m"])[0], np.var(window), rtol=1e-6, atol=1e-3)
+        assert np.isclose(store.ewma_value("home_xg", ["m"])[0], ewma)
+
+
+def test_rows_are_independent_and_reused():
+    store = HistoryStore(metrics=("home_xg",), length=3, capacity=1)
+    store.push(["a", "b"], "home_xg", [1.0, 5.0])
+    store.push(["a", "b"], "home_xg", [2.0, 7.0])
+    assert store.mean("home_xg", ["a", "b", "unknown"], default=-1).tolist() == [1.5, 6.0, -1]
+    store.remove("a")
+    store.push(["c"], "home_xg", [4.0])
+    assert store.slots["c"] == 0 and store.window("home_xg", "c") == [4.0]
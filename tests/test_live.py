@@ -0,0 +1,57 @@
+import asyncio
+
+from odds_apex import live
+from odds_apex.stream import price_ticks
+
+
+async def _source(ticks):
+    for tick in ticks:
+        yield tick
+
+
+def _run(*sources, presets=("main", "memory")):
+    results = []
+    engine = live.LiveEngine(presets, on_result=results.append)
+    asyncio.run(engine.run(*(_source(ticks) for ticks in sources)))
+    return engine, results
+
+
+def test_bad_ticks_do_not_stop_the_feed():
+    engine, results = _run(
+        [{"Match Id": [1], "Home Xg": 1.0}, {"Match Id": "a", "Home Xg": "x"}, {"Match Id": "a", "Home Xg": 1.1}],
+        [{"Match Id": {"id": 2}}, ValueError("invalid JSON"), {"Match Id": "b", "Home Xg": [1, 2]},
+         {"Match Id": "b", "Home Xg": 0.9}],
+    )
+    errors = [result for result in results if "error" in result]
+    assert [error["match_id"] for error in errors] == [None, None, "a", None, "b"]
+    assert "invalid match id" in errors[0]["error"] and "invalid input" in errors[4]["error"]
+    good = {result["match_id"]: result for result in results if "results" in result}
+    assert set(good) == {"a", "b"} and good["a"]["tick"] == 1 and good["b"]["tick"] == 1
+    assert engine.matches["a"].ticks == 1
+
+
+def test_pricing_failure_is_reported_and_the_match_recovers(monkeypatch):
+    evaluate_presets = live.evaluate_presets
+
+    def failing(states, *args, **kwargs):
+        if states["home_xg"][0] == 9:
+            raise FloatingPointError("overflow")
+        return evaluate_presets(states, *args, **kwargs)
+
+    monkeypatch.setattr(live, "evaluate_presets", failing)
+    engine, results = _run([{"Match Id": "a", "Home Xg": 9}, {"Match Id": "a", "Home Xg": 1.2}],
+                           [{"Match Id": "b", "Home Xg": 1.0}])
+    by_match = {(result["match_id"], result["tick"]): result for result in results}
+    assert by_match[("a", 1)]["error"] == "pricing failed: overflow"
+    assert "results" in by_match[("a", 2)] and "results" in by_match[("b", 1)]
+    assert engine.matches["a"].result is by_match[("a", 2)]["results"]
+
+
+def test_matches_are_priced_as_separate_streams():
+    a = [{"Match Id": "a", "Home Xg": 1.0 + i / 10, "Elapsed Minutes": 10 * i} for i in range(4)]
+    b = [{"Match Id": "b", "Away Xg": 2.0 - i / 10, "Elapsed Minutes": 5 * i} for i in range(4)]
+    _, results = _run(a, b)
+    for ticks, match_id in ((a, "a"), (b, "b")):
+        alone = [result["results"] for result in price_ticks(enumerate(ticks, 1), ("main", "memory"))]
+        mixed = [result["results"] for result in results if result["match_id"] == match_id]
+        assert mixed == alone
@@ -0,0 +1,36 @@
+import numpy as np
+
+from odds_apex.markets import goal_difference_pmf, match_odds
+from odds_apex.nb import nb_pmf
+
+
+def _loop(pmf_home, pmf_away, home_goals, away_goals):
+    """The scripts' double loop over extra goals."""
+    home = draw = away = 0.0
+    for gh, p_home in enumerate(pmf_home):
+        for ga, p_away in enumerate(pmf_away):
+            prob = p_home * p_away
+            if home_goals + gh > away_goals + ga:
+                home += prob
+            elif home_goals + gh == away_goals + ga:
+                draw += prob
+            else:
+                away += prob
+    return home, draw, away
+
+
+def test_match_odds_matches_the_loop():
+    rng = np.random.default_rng(2)
+    lambda_home, lambda_away = rng.uniform(0.05, 4, 200), rng.uniform(0.05, 4, 200)
+    home_goals, away_goals = rng.integers(0, 8, 200), rng.integers(0, 8, 200)
+    for r, goals in ((2, 5), (3, 5), (3, 9)):
+        pmf_home, pmf_away = nb_pmf(lambda_home, r, goals), nb_pmf(lambda_away, r, goals)
+        batched = np.stack(match_odds(pmf_home, pmf_away, home_goals, away_goals), axis=-1)
+        looped = np.array([_loop(pmf_home[i], pmf_away[i], home_goals[i], away_goals[i]) for i in range(200)])
+        assert np.allclose(batched, looped, rtol=0, atol=1e-14)
+
+
+def test_uneven_pmfs_and_scalars():
+    pmf_home, pmf_away = nb_pmf(1.3, 3, 7), nb_pmf(0.6, 2, 3)
+    assert np.allclose(match_odds(pmf_home, pmf_away, 1, 2), _loop(pmf_home, pmf_away, 1, 2), atol=1e-14)
+    assert np.isclose(goal_difference_pmf(pmf_home, pmf_away).sum(), pmf_home.sum() * pmf_away.sum())
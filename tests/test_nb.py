@@ -0,0 +1,35 @@
+import numpy as np
+
+from odds_apex.nb import DEFAULT_TAIL_TOLERANCE, adaptive_score_grid, nb_pmf, score_grid, tail_bounded_pmf
+
+
+def test_truncation_error_is_the_mass_left_out():
+    lambdas = np.array([0.1, 0.3, 0.8, 1.5, 2.5, 4.0])
+    for tolerance in (1e-2, 1e-3, 1e-6):
+        adaptive = adaptive_score_grid(lambdas, lambdas[::-1], r=2, tolerance=tolerance)
+        full_home = nb_pmf(lambdas, 2, 200)
+        full_away = nb_pmf(lambdas[::-1], 2, 200)
+        kept = np.array([
+            full_home[i, :adaptive.home_goals[i] + 1].sum() * full_away[i, :adaptive.away_goals[i] + 1].sum()
+            for i in range(lambdas.size)
+        ])
+        assert np.allclose(adaptive.truncation_error, 1 - kept, atol=1e-12)
+        assert np.allclose(adaptive.truncation_error, 1 - adaptive.grid.sum(axis=(-2, -1)))
+        assert (adaptive.truncation_error <= tolerance).all()
+
+
+def test_bound_is_the_smallest_that_meets_the_tolerance():
+    tolerance = 1e-4
+    pmf, goals = tail_bounded_pmf(np.array([0.3, 1.2]), 3, tolerance)
+    full = nb_pmf(np.array([0.3, 1.2]), 3, 100)
+    for i, n in enumerate(goals):
+        assert 1 - full[i, :n + 1].sum() <= tolerance < 1 - full[i, :n].sum()
+        assert np.allclose(pmf[i, :n + 1], full[i, :n + 1]) and (pmf[i, n + 1:] == 0).all()
+
+
+def test_default_shrinks_late_grids_and_grows_early_ones():
+    late = adaptive_score_grid(0.3, 0.2, r=2, tolerance=DEFAULT_TAIL_TOLERANCE)
+    early = adaptive_score_grid(2.5, 1.8, r=2, tolerance=DEFAULT_TAIL_TOLERANCE)
+    assert late.grid.size < 36 < early.grid.size
+    fixed = score_grid(2.5, 1.8, r=2)
+    assert early.truncation_error < 1 - fixed.sum()
@@ -0,0 +1,38 @@
+import numpy as np
+
+from odds_apex.nb import nb_pmf
+from odds_apex.pmf_cache import PmfTable
+
+
+def test_scalar_hits_and_misses():
+    table = PmfTable()
+    assert np.allclose(table.pmf(1.2345, 3), nb_pmf(1.235, 3))
+    table.pmf(12.0, 3)            # past max_lambda
+    table.pmf(1.2, 4)             # r without a table
+    table.pmf(1.2, 3, exact=True)
+    table.pmf(12.0, 3)            # again: from the LRU
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+    assert (stats["lru_hits"], stats["lru_misses"], stats["lru_size"]) == (1, 3, 3)
+    assert stats["tables"] == [3]
+
+
+def test_array_counts_and_values():
+    table = PmfTable(step=0.001)
+    lambdas = np.array([[0.5, 2.0004], [11.0, np.nan]])
+    pmf = table.pmf(lambdas, 2)
+    assert pmf.shape == (2, 2, 6)
+    assert (table.hits, table.misses) == (2, 2)
+    assert np.allclose(pmf[0, 1], nb_pmf(2.0, 2)) and np.allclose(pmf[1, 0], nb_pmf(11.0, 2))
+    assert np.isnan(pmf[1, 1]).all()
+    # Within half a step of the exact pmf everywhere in the table.
+    grid = np.random.default_rng(1).uniform(0, 10, 1000)
+    assert np.abs(table.pmf(grid, 2) - nb_pmf(grid, 2)).max() < 1e-3
+
+
+def test_clear_resets_the_counts():
+    table = PmfTable()
+    table.pmf(np.array([1.0, 20.0]), 3)
+    table.clear()
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"], stats["lru_size"]) == (0, 0, 0)
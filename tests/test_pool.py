@@ -0,0 +1,59 @@
+import pickle
+
+import numpy as np
+
+from odds_apex.bench import synthetic_states
+from odds_apex.pmf_cache import PmfTable
+from odds_apex.pool import ShardedEvaluator
+from odds_apex.registry import PRESETS, evaluate_presets
+from odds_apex.staking import stake_preset
+
+NAMES = ["main", "lay_score", "hedge"]
+
+
+def _assert_same(sharded, expected):
+    if isinstance(expected, dict):
+        assert list(sharded) == list(expected)
+        for key in expected:
+            _assert_same(sharded[key], expected[key])
+    else:
+        assert np.shape(sharded) == np.shape(expected)
+        # Padded grids are summed in a different shape, so allow for rounding.
+        np.testing.assert_allclose(sharded, expected, rtol=0, atol=1e-12)
+
+
+def test_sharded_results_keep_input_order():
+    states = synthetic_states(1000, seed=5)
+    prior_home = np.linspace(0.5, 2.5, 1000)
+    expected = evaluate_presets(states, NAMES, prior_home, 1.2)
+    with ShardedEvaluator(workers=2, chunk_size=137) as evaluator:
+        assert len(evaluator.chunks(1000)) == 8
+        _assert_same(evaluator.evaluate(states, NAMES, prior_home, 1.2), expected)
+        staked = evaluator.stake(states, NAMES, prior_home, 1.2)
+    _assert_same(staked, {name: stake_preset(PRESETS[name], expected[name], states) for name in NAMES})
+
+
+def test_tail_bounded_chunks_are_padded_like_one_batch():
+    states = synthetic_states(600, seed=6)
+    expected = evaluate_presets(states, ["lay_score"], tail_tolerance=1e-4)
+    with ShardedEvaluator(workers=1, chunk_size=50) as evaluator:
+        sharded = evaluator.evaluate(states, ["lay_score"], tail_tolerance=1e-4)
+    _assert_same(sharded, expected)
+
+
+def test_pmf_table_goes_to_the_workers():
+    states = synthetic_states(300, seed=7)
+    table = PmfTable()
+    table.pmf(1.0, 3)
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy.stats()["hits"] == 0 and copy.step == table.step
+    expected = evaluate_presets(states, NAMES, pmf=PmfTable().pmf)
+    with ShardedEvaluator(workers=2, chunk_size=64, pmf=table.pmf) as evaluator:
+        _assert_same(evaluator.evaluate(states, NAMES), expected)
+
+
+def test_empty_batch():
+    states = {name: column[:0] for name, column in synthetic_states(1).items()}
+    with ShardedEvaluator(workers=1) as evaluator:
+        assert evaluator.chunks(0) == [(0, 0)]
+        assert evaluator.stake(states, ["main"])["main"]["home"]["stake"].shape == (0,)
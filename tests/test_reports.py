@@ -0,0 +1,82 @@
+"""
+ScriptReport.report against recorded output.
+
+reports_baseline.json holds a sequence of form values and, for every
+script, the records each click of that sequence produced.  Each script is
+clicked through the whole sequence with a fresh history, as its window
+would be, so the history-based blends are covered too.  After an intended
+change to a script's output, re-record from the repository root with
+
+    python -m tests.test_reports
+
+and review the diff of the JSON file.
+"""
+import json
+import os
+
+import pytest
+
+from odds_apex.bench import synthetic_states
+from odds_apex.history import History
+from odds_apex.registry import PRESETS
+from odds_apex.render import record
+from odds_apex.reports import LAYOUTS, ScriptReport
+from odds_apex.state import MatchBatch, MatchState
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports_baseline.json")
+
+
+def _forms():
+    """One match's clicks: the minutes run forward, with a few awkward forms along the way."""
+    states = synthetic_states(12, seed=11)
+    states["elapsed_minutes"].sort()
+    forms = [{name: round(value, 2) if isinstance(value, float) else value for name, value in state.items()}
+             for state in MatchBatch(states).states()]
+    forms[3]["selected_scoreline"] = "bad"
+    forms[5]["selected_scoreline"] = "9-9"
+    forms[7]["live_selected_odds"] = 0.0
+    forms[8]["market_odds_current"] = 0.0
+    # Click again in the same minute with only the odds moved.
+    forms.insert(10, dict(forms[9], live_odds_home=round(forms[9]["live_odds_home"] * 1.1, 2)))
+    return forms
+
+
+def _clicks(name, forms):
+    model = ScriptReport(name, History(timescale=PRESETS[name].momentum_timescale))
+    return [[list(record(line)) for line in model.report(MatchState.from_fields(form))] for form in forms]
+
+
+def _load():
+    with open(BASELINE) as baseline:
+        return json.load(baseline)
+
+
+@pytest.mark.parametrize("name", sorted(LAYOUTS))
+def test_report_matches_baseline(name):
+    baseline = _load()
+    clicks = _clicks(name, baseline["forms"])
+    expected = baseline["reports"][name]
+    assert len(clicks) == len(expected)
+    for click, (records, recorded) in enumerate(zip(clicks, expected)):
+        assert records == recorded, f"{name}: click {click} differs from the recorded output"
+
+
+def record_baseline():
+    forms = _forms()
+    reports = {name: _clicks(name, forms) for name in sorted(LAYOUTS)}
+    # One form and one record per line, so a re-recording diffs line by line.
+    with open(BASELINE, "w") as out:
+        out.write('{"forms": [\n')
+        out.write(",\n".join(json.dumps(form) for form in forms))
+        out.write('\n], "reports": {\n')
+        out.write(",\n".join(
+            f"{json.dumps(name)}: [\n" + ",\n".join(
+                "[\n" + ",\n".join(json.dumps(line) for line in click) + "\n]" for click in clicks
+            ) + "\n]"
+            for name, clicks in reports.items()
+        ))
+        out.write("\n}}\n")
+
+
+if __name__ == "__main__":
+    record_baseline()
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from odds_apex.store import MappedHistoryStore
+
+
+def _push(store, match_id, home_xg, minute):
+    store.push_states([match_id], [{"home_xg": home_xg, "away_xg": 1.0, "elapsed_minutes": minute}])
+
+
+def test_reopen_keeps_history(tmp_path):
+    path = str(tmp_path / "history.dat")
+    store = MappedHistoryStore(path, length=4, timescale=15.0)
+    for minute, value in enumerate((1.0, 2.0, 3.0)):
+        _push(store, "ars-che", value, 10 * minute)
+    _push(store, 7, 0.5, 0)
+    expected = store.expected_lambda('home', ["ars-che", 7])
+    store.close()
+
+    reopened = MappedHistoryStore(path, length=99, timescale=None)
+    assert (reopened.length, reopened.timescale) == (4, 15.0)
+    assert np.array_equal(reopened.expected_lambda('home', ["ars-che", "7"]), expected)
+    assert reopened.count("home_xg", ["ars-che"])[0] == 3
+    _push(reopened, "ars-che", 4.0, 30)
+    assert reopened.count("home_xg", ["ars-che"])[0] == 4
+
+
+def test_growing_past_capacity(tmp_path):
+    path = str(tmp_path / "history.dat")
+    store = MappedHistoryStore(path, capacity=2)
+    for match in range(5):
+        _push(store, match, float(match), 0)
+    store.close()
+    reopened = MappedHistoryStore(path)
+    assert reopened.mean("home_xg", [0, 1, 2, 3, 4]).tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_readonly_sees_writes_after_refresh(tmp_path):
+    path = str(tmp_path / "history.dat")
+    writer = MappedHistoryStore(path, capacity=2)
+    _push(writer, "a", 1.5, 0)
+    writer.flush()
+    reader = MappedHistoryStore(path, readonly=True)
+    assert reader.mean("home_xg", ["a"])[0] == 1.5
+    with pytest.raises(KeyError):
+        reader.slot("b")
+    with pytest.raises(ValueError):
+        reader.buffers[0] = 0.0
+
+    for match in ("b", "c", "d"):
+        _push(writer, match, 2.5, 0)
+    writer.flush()
+    assert reader.count("home_xg", ["d"])[0] == 0
+    reader.refresh()
+    assert reader.mean("home_xg", ["a", "d"]).tolist() == [1.5, 2.5]
+
+
+def test_readonly_needs_the_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        MappedHistoryStore(str(tmp_path / "missing.dat"), readonly=True)
+
+
+def test_removed_rows_stay_removed(tmp_path):
+    path = str(tmp_path / "history.dat")
+    store = MappedHistoryStore(path)
+    _push(store, "a", 1.0, 0)
+    _push(store, "b", 2.0, 0)
+    store.remove("a")
+    store.close()
+    reopened = MappedHistoryStore(path)
+    assert set(reopened.slots) == {"b"}
+    _push(reopened, "c", 3.0, 0)
+    assert reopened.slots["c"] == 0
@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+
+from odds_apex import stream
+from odds_apex.engine import stack_states
+
+
+def _run(text, presets=("main", "memory")):
+    out = io.StringIO()
+    stream.run(io.StringIO(text), out, presets)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_bad_lines_give_error_records():
+    results = _run('{"Home Xg": 1.2}\nnot json\n[1, 2]\n{"Home Xg": [1, 2]}\n{"Home Xg": "x"}\n{"Home Xg": 1.3}\n')
+    assert [result["tick"] for result in results] == [1, 2, 3, 4, 5, 6]
+    assert ["error" in result for result in results] == [False, True, True, True, True, False]
+    assert "expected a single value" in results[3]["error"]
+
+
+def test_single_rejects_columns():
+    with pytest.raises(ValueError):
+        stack_states({"Home Xg": [1.0, 2.0]}, single=True)
+    assert stack_states({"Home Xg": [1.0, 2.0]})["home_xg"].tolist() == [1.0, 2.0]
+
+
+def test_pricing_failure_is_one_error(monkeypatch):
+    evaluate_presets = stream.evaluate_presets
+
+    def failing(states, *args, **kwargs):
+        if states["home_xg"][0] == 9:
+            raise FloatingPointError("overflow")
+        return evaluate_presets(states, *args, **kwargs)
+
+    monkeypatch.setattr(stream, "evaluate_presets", failing)
+    results = _run('{"Home Xg": 1.2}\n{"Home Xg": 9}\n{"Home Xg": 1.2}\n')
+    assert results[1] == {"tick": 2, "error": "pricing failed: overflow"}
+    assert "results" in results[2]
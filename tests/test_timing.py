@@ -0,0 +1,83 @@
+import sys
+import threading
+
+from odds_apex.timing import StageTimer
+
+
+def test_ticks_and_stats():
+    timer = StageTimer(enabled=True, window=4)
+    for _ in range(6):
+        timer.start()
+        timer.lap("grid")
+        timer.lap("grid")
+        timer.stop("output")
+    stats = timer.stats()
+    assert sorted(stats) == ["grid", "output", "total"]
+    assert stats["grid"]["ticks"] == 6
+    assert timer.values("grid").size == 4
+    assert sum(timer.histogram("total")) == 4
+
+
+def test_disabled_timer_records_nothing():
+    timer = StageTimer()
+    timer.start()
+    timer.lap("grid")
+    timer.stop("output")
+    assert timer.timed("output", lambda: 3) == 3
+    assert timer.stats() == {}
+
+
+def test_each_thread_has_its_own_tick():
+    timer = StageTimer(enabled=True)
+    timer.start()
+    timer.lap("grid")
+
+    def other():
+        timer.start()
+        timer.lap("history")
+        timer.stop()
+        timer.timed("output", lambda: None)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    timer.stop("staking")
+    stats = timer.stats()
+    assert stats["total"]["ticks"] == 2
+    assert {stage: row["ticks"] for stage, row in stats.items()} == {
+        "history": 1, "total": 2, "output": 1, "grid": 1, "staking": 1,
+    }
+
+
+def test_stats_while_another_thread_records():
+    # The worker thread adds stages while the Tk thread dumps the stats.
+    timer = StageTimer(enabled=True, window=8)
+    done = threading.Event()
+    errors = []
+
+    def worker():
+        try:
+            for number in range(3000):
+                timer.start()
+                timer.lap(f"stage{number % 500}")
+                timer.stop("output")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=worker)
+    thread.start()
+    try:
+        while not done.is_set():
+            timer.stats()
+            timer.report()
+    except Exception as e:
+        errors.append(e)
+    finally:
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert not errors
+    assert timer.stats()["total"]["ticks"] == 3000